@@ -17,6 +17,7 @@ from typing import Dict, List, Any
 from datetime import datetime, timedelta
 import logging
 
+from . import business_rules
 from .business_rules import get_rules_engine, RuleType, CommissionRule, MarketingStrategy
 from .models import CreatorProfile
 
@@ -43,7 +44,14 @@ def require_admin_auth(f):
             return jsonify({"error": "Admin permissions required"}), 403
         
         request.admin_user = user_info
-        return f(*args, **kwargs)
+        
+        # Publish every rules change made by this request in one round trip
+        sync_service = getattr(business_rules.rules_engine, "_sync_service", None)
+        if sync_service is None:
+            return f(*args, **kwargs)
+        
+        with sync_service.deferred_broadcasts(f"admin:{user_info['user_id']}"):
+            return f(*args, **kwargs)
     
     return decorated_function
 
@@ -474,8 +482,8 @@ def commission_simulation():
             volumes = scenario["volumes"]
             
             results[tier] = []
-            for volume in volumes:
-                rate = rules_engine.get_commission_rate(tier, volume)
+            rates = rules_engine.get_commission_rates(tier, volumes)
+            for volume, rate in zip(volumes, rates):
                 commission_amount = volume * rate
                 creator_earnings = volume - commission_amount
                 
@@ -1,12 +1,17 @@
 import os
+import orjson
 from flask import Flask, jsonify
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
+from flask_compress import Compress
 from dotenv import load_dotenv
 from database import db
 from routes import bp
+from db_helper import json_serializer
+from stripe_connect import assert_configured
 from error_handling import register_error_handlers
 import logging
 from logging.handlers import RotatingFileHandler
@@ -14,15 +19,39 @@ from logging.handlers import RotatingFileHandler
 # Load environment variables
 load_dotenv()
 
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson; datetimes are emitted as ISO 8601 UTC"""
+
+    OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
 def create_app():
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     
     # Configuration
     app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'dev-secret-key')
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret')
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///onboarding.db')
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    
+    # JSON columns (content categories, queued email payloads) go through orjson
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'json_serializer': json_serializer,
+        'json_deserializer': orjson.loads
+    }
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 1024 * 1024))  # 1 MB
+
+    # Refuse to start without Stripe credentials rather than failing per request
+    if not app.debug and not app.testing:
+        assert_configured()
+
     # Email configuration
     app.config['MAIL_SERVER'] = os.getenv('SMTP_HOST', 'localhost')
     app.config['MAIL_PORT'] = int(os.getenv('SMTP_PORT', 587))
@@ -30,6 +59,12 @@ def create_app():
     app.config['MAIL_USERNAME'] = os.getenv('SMTP_USERNAME')
     app.config['MAIL_PASSWORD'] = os.getenv('SMTP_PASSWORD')
     app.config['MAIL_DEFAULT_SENDER'] = os.getenv('EMAIL_FROM', 'noreply@example.com')
+
+    # Response compression (Brotli preferred, gzip fallback)
+    app.config['COMPRESS_ALGORITHM'] = ['br', 'gzip']
+    app.config['COMPRESS_MIN_SIZE'] = 500
+    app.config['COMPRESS_LEVEL'] = 4
+    app.config['COMPRESS_BR_LEVEL'] = 4
     
     # Initialize extensions
     db.init_app(app)
@@ -37,6 +72,7 @@ def create_app():
     CORS(app, origins=os.getenv('ALLOWED_ORIGINS', '*').split(','))
     JWTManager(app)
     Mail(app)
+    Compress(app)
     
     # Register blueprints
     app.register_blueprint(bp, url_prefix='/api')
@@ -10,20 +10,57 @@ Provides dynamic configuration of business logic without code deployment:
 Supports hot-reload and real-time rule updates via admin dashboard.
 """
 
-import json
 import logging
-from typing import Dict, List, Optional, Any, Tuple
-from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+import time
+import zlib
+from bisect import bisect_right
+from typing import Annotated, Dict, List, NamedTuple, Optional, Any, Tuple
+from datetime import datetime, timedelta, timezone
+from dataclasses import asdict, dataclass, is_dataclass, replace
+from functools import lru_cache
 from enum import Enum
+import orjson
 import redis
+from pydantic import BaseModel, Field, StrictBool, TypeAdapter, ValidationError, model_validator
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
 
-class RuleType(Enum):
-    """Types of business rules supported"""
+# Category-specific strategy adjustments, applied by _customize_strategy_for_categories
+CATEGORY_ADJUSTMENTS = {
+    "fitness": {
+        "content_schedule": {"instagram": +2, "tiktok": +1},
+        "engagement_tactics": ["workout_challenges", "transformation_posts"]
+    },
+    "lifestyle": {
+        "content_schedule": {"instagram": +1, "twitter": +2},
+        "engagement_tactics": ["day_in_life", "product_reviews"]
+    },
+    "adult": {
+        "content_schedule": {"onlyfans": +3},
+        "engagement_tactics": ["exclusive_content", "personalized_messages"]
+    }
+}
+
+
+def _stream_ms(moment: datetime) -> int:
+    """Naive UTC datetime as epoch milliseconds, the time part of a stream ID"""
+    return int(moment.replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def _parse_datetime(value):
+    """Datetime from an ISO 8601 string as decoded off the wire; other values pass through"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+class RuleType(str, Enum):
+    """
+    Types of business rules supported
+    
+    The str mixin gives members str's C-level hash, so the rules_cache
+    lookups on every rule read skip Enum's Python-level __hash__.
+    """
     COMMISSION = "commission"
     MARKETING = "marketing"
     ONBOARDING = "onboarding" 
@@ -31,7 +68,7 @@ class RuleType(Enum):
     A_B_TESTING = "ab_testing"
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class CommissionRule:
     """Commission calculation rule"""
     tier: str  # entry, mid, premium
@@ -43,7 +80,22 @@ class CommissionRule:
     expires_date: Optional[datetime] = None
 
 
-@dataclass  
+class CommissionSchedule(NamedTuple):
+    """Commission rule flattened for lookup: thresholds ascending, rates aligned"""
+    thresholds: Tuple[float, ...]
+    rates: Tuple[float, ...]
+    base_rate: float
+    min_rate: float
+    max_rate: float
+    
+    def rate_for(self, monthly_volume: float) -> float:
+        """Rate at the highest threshold reached, clamped to the min/max rates"""
+        index = bisect_right(self.thresholds, monthly_volume) - 1
+        rate = self.rates[index] if index >= 0 else self.base_rate
+        return max(self.min_rate, min(self.max_rate, rate))
+
+
+@dataclass(slots=True, frozen=True)
 class MarketingStrategy:
     """Marketing strategy configuration"""
     account_size: str  # micro, small, medium, large
@@ -65,6 +117,31 @@ class OnboardingRule:
     time_limits: Dict[str, int]  # step -> minutes
 
 
+Rate = Annotated[float, Field(ge=0, le=1, strict=True)]
+
+
+class CommissionRuleIn(BaseModel):
+    """Shape of one tier in a commission rules update"""
+    base_rate: Rate
+    volume_thresholds: list
+    min_rate: Rate
+    max_rate: Rate
+    
+    @model_validator(mode="after")
+    def check_bounds(self):
+        if self.min_rate > self.max_rate:
+            raise ValueError("min_rate must not exceed max_rate")
+        return self
+
+
+# Update payload validators by rule type; validation stops at the first
+# failure inside pydantic-core. Types without an entry are accepted as-is.
+RULES_VALIDATORS = {
+    RuleType.COMMISSION: TypeAdapter(Dict[str, CommissionRuleIn]),
+    RuleType.FEATURE_FLAGS: TypeAdapter(Dict[str, StrictBool]),
+}
+
+
 class BusinessRulesEngine:
     """
     Central engine for managing all business rules
@@ -77,6 +154,10 @@ class BusinessRulesEngine:
     - Audit logging for compliance
     """
     
+    VERSION_KEY = "ofm:rules:version:seq"  # INCR counter shared by all workers
+    AUDIT_STREAM_KEY = "ofm:audit:rules:stream"
+    AUDIT_RETENTION_DAYS = 365
+    
     def __init__(self, db_session_factory, redis_client: Optional[redis.Redis] = None):
         self.db_session_factory = db_session_factory
         self.redis = redis_client or redis.Redis.from_url("redis://localhost:6379/2")
@@ -84,21 +165,31 @@ class BusinessRulesEngine:
         self.rules_cache = {}
         self.version = self._get_current_version()
         
+        # In-process memo of resolved lookups, cleared whenever rules change
+        self._commission_schedule_lookup = lru_cache(maxsize=64)(self._resolve_commission_schedule)
+        self._strategy_lookup = lru_cache(maxsize=512)(self._resolve_marketing_strategy)
+        
+        # Feature flag map held briefly in-process so repeated checks skip Redis
+        self.flag_cache_ttl = 5  # seconds
+        self._flag_cache: Optional[Tuple[float, Dict[str, bool]]] = None
+        
+        # Set by rules_sync.enhance_rules_engine_with_sync
+        self._sync_service = None
+        
         # Load initial rules
         self._load_all_rules()
     
     def _get_cache_key(self, rule_type: RuleType, identifier: str = "") -> str:
-        """Generate Redis cache key"""
-        base_key = f"ofm:rules:{rule_type.value}"
+        """Generate Redis cache key, scoped to the rules version"""
+        base_key = f"ofm:rules:v{self.version}:{rule_type.value}"
         return f"{base_key}:{identifier}" if identifier else base_key
     
-    def _get_current_version(self) -> str:
+    def _get_current_version(self) -> int:
         """Get current rules version for cache invalidation"""
         try:
-            version = self.redis.get("ofm:rules:version")
-            return version.decode() if version else "1.0.0"
+            return int(self.redis.get(self.VERSION_KEY) or 0)
         except:
-            return "1.0.0"
+            return 0
     
     def _load_all_rules(self):
         """Load all rules from database and cache"""
@@ -115,13 +206,21 @@ class BusinessRulesEngine:
         except Exception as e:
             logger.error(f"Failed to load business rules: {str(e)}")
             self._load_default_rules()
+        
+        self.clear_lookup_caches()
+    
+    def clear_lookup_caches(self):
+        """Drop memoized lookups and cached feature flags after a rules change"""
+        self._commission_schedule_lookup.cache_clear()
+        self._strategy_lookup.cache_clear()
+        self._flag_cache = None
     
     def _load_default_rules(self):
         """Load sensible default rules when database is unavailable"""
         logger.warning("Loading default business rules as fallback")
         
         # Default commission rules
-        self.rules_cache[RuleType.COMMISSION] = {
+        commission_rules = {
             "entry": CommissionRule(
                 tier="entry",
                 base_rate=0.20,  # 20% base commission
@@ -161,7 +260,7 @@ class BusinessRulesEngine:
         }
         
         # Default marketing strategies
-        self.rules_cache[RuleType.MARKETING] = {
+        marketing_strategies = {
             "micro": MarketingStrategy(
                 account_size="micro",
                 pricing_suggestions={
@@ -199,7 +298,7 @@ class BusinessRulesEngine:
         }
         
         # Default feature flags
-        self.rules_cache[RuleType.FEATURE_FLAGS] = {
+        feature_flags = {
             "email_verification": True,
             "stripe_connect": True,
             "marketing_automation": True,
@@ -208,6 +307,23 @@ class BusinessRulesEngine:
             "advanced_analytics": False,
             "beta_features": False
         }
+        
+        self._swap_rules({
+            RuleType.COMMISSION: commission_rules,
+            RuleType.MARKETING: marketing_strategies,
+            RuleType.FEATURE_FLAGS: feature_flags
+        })
+    
+    def _swap_rules(self, updates: Dict[RuleType, Any]):
+        """
+        Publish rule changes copy-on-write
+        
+        A new mapping is built and bound in one assignment, so concurrent
+        readers see either the old rules or the new ones without locking.
+        """
+        rules_cache = dict(self.rules_cache)
+        rules_cache.update(updates)
+        self.rules_cache = rules_cache
     
     def get_commission_rate(self, creator_tier: str, monthly_volume: float) -> float:
         """
@@ -221,34 +337,13 @@ class BusinessRulesEngine:
             Commission rate as decimal (0.15 = 15%)
         """
         try:
-            cache_key = self._get_cache_key(RuleType.COMMISSION, creator_tier)
-            cached = self.redis.get(cache_key)
-            
-            if cached:
-                rule_data = json.loads(cached)
-                rule = CommissionRule(**rule_data)
-            else:
-                rules = self.rules_cache.get(RuleType.COMMISSION, {})
-                rule = rules.get(creator_tier)
-                
-                if not rule:
-                    logger.warning(f"No commission rule found for tier {creator_tier}, using default")
-                    return 0.20  # Default 20%
-                
-                # Cache the rule
-                self.redis.setex(cache_key, self.cache_ttl, json.dumps(asdict(rule), default=str))
-            
-            # Apply degressive scale
-            rate = rule.base_rate
+            schedule = self._commission_schedule_lookup(creator_tier)
             
-            for threshold_rule in sorted(rule.volume_thresholds, key=lambda x: x["threshold"]):
-                if monthly_volume >= threshold_rule["threshold"]:
-                    rate = threshold_rule["rate"]
-                else:
-                    break
+            if not schedule:
+                logger.warning(f"No commission rule found for tier {creator_tier}, using default")
+                return 0.20  # Default 20%
             
-            # Apply min/max constraints
-            rate = max(rule.min_rate, min(rule.max_rate, rate))
+            rate = schedule.rate_for(monthly_volume)
             
             logger.debug(f"Commission rate for {creator_tier} (${monthly_volume}): {rate:.2%}")
             return rate
@@ -257,6 +352,73 @@ class BusinessRulesEngine:
             logger.error(f"Error calculating commission rate: {str(e)}")
             return 0.20  # Safe default
     
+    def get_commission_rates(self, creator_tier: str, monthly_volumes: List[float]) -> List[float]:
+        """
+        Calculate commission rates for several volumes in one tier
+        
+        The tier's schedule is resolved once for the whole batch.
+        
+        Args:
+            creator_tier: entry, mid, or premium
+            monthly_volumes: Monthly revenue volumes to quote
+            
+        Returns:
+            Commission rates aligned with monthly_volumes
+        """
+        try:
+            schedule = self._commission_schedule_lookup(creator_tier)
+            
+            if not schedule:
+                logger.warning(f"No commission rule found for tier {creator_tier}, using default")
+                return [0.20] * len(monthly_volumes)
+            
+            rate_for = schedule.rate_for
+            return [rate_for(volume) for volume in monthly_volumes]
+            
+        except Exception as e:
+            logger.error(f"Error calculating commission rates: {str(e)}")
+            return [0.20] * len(monthly_volumes)
+    
+    def _resolve_commission_rule(self, creator_tier: str) -> Optional[CommissionRule]:
+        """Resolve commission rule for a tier from Redis or in-memory rules"""
+        # Redis only ever holds tiers this version knows, so unknown names
+        # are answered without a round trip
+        if creator_tier not in self.rules_cache.get(RuleType.COMMISSION, {}):
+            return None
+        
+        cache_key = self._get_cache_key(RuleType.COMMISSION, creator_tier)
+        cached = self.redis.get(cache_key)
+        
+        if cached:
+            rule_data = orjson.loads(cached)
+            rule = CommissionRule(**rule_data)
+        else:
+            rules = self.rules_cache.get(RuleType.COMMISSION, {})
+            rule = rules.get(creator_tier)
+            
+            if not rule:
+                return None
+            
+            # Cache the rule
+            self.redis.setex(cache_key, self.cache_ttl, orjson.dumps(rule, default=str))
+        
+        return rule
+    
+    def _resolve_commission_schedule(self, creator_tier: str) -> Optional[CommissionSchedule]:
+        """Resolve a tier's commission rule into sorted threshold/rate arrays"""
+        rule = self._resolve_commission_rule(creator_tier)
+        if not rule:
+            return None
+        
+        steps = sorted((t["threshold"], t["rate"]) for t in rule.volume_thresholds)
+        return CommissionSchedule(
+            thresholds=tuple(threshold for threshold, _ in steps),
+            rates=tuple(rate for _, rate in steps),
+            base_rate=rule.base_rate,
+            min_rate=rule.min_rate,
+            max_rate=rule.max_rate
+        )
+    
     def get_marketing_strategy(self, account_size: str, creator_categories: List[str] = None) -> Optional[MarketingStrategy]:
         """
         Get marketing strategy for creator based on account size and categories
@@ -269,26 +431,11 @@ class BusinessRulesEngine:
             MarketingStrategy object or None
         """
         try:
-            cache_key = self._get_cache_key(RuleType.MARKETING, account_size)
-            cached = self.redis.get(cache_key)
-            
-            if cached:
-                strategy_data = json.loads(cached)
-                strategy = MarketingStrategy(**strategy_data)
-            else:
-                strategies = self.rules_cache.get(RuleType.MARKETING, {})
-                strategy = strategies.get(account_size)
-                
-                if not strategy:
-                    logger.warning(f"No marketing strategy found for account size {account_size}")
-                    return None
-                
-                # Cache the strategy
-                self.redis.setex(cache_key, self.cache_ttl, json.dumps(asdict(strategy), default=str))
+            categories_key = tuple(sorted(creator_categories)) if creator_categories else ()
+            strategy = self._strategy_lookup(account_size, categories_key)
             
-            # Customize based on creator categories if provided
-            if creator_categories:
-                strategy = self._customize_strategy_for_categories(strategy, creator_categories)
+            if not strategy:
+                logger.warning(f"No marketing strategy found for account size {account_size}")
             
             return strategy
             
@@ -296,47 +443,61 @@ class BusinessRulesEngine:
             logger.error(f"Error getting marketing strategy: {str(e)}")
             return None
     
+    def _resolve_marketing_strategy(self, account_size: str, categories: Tuple[str, ...]) -> Optional[MarketingStrategy]:
+        """Resolve marketing strategy from Redis or in-memory rules and customize it"""
+        if account_size not in self.rules_cache.get(RuleType.MARKETING, {}):
+            return None
+        
+        cache_key = self._get_cache_key(RuleType.MARKETING, account_size)
+        cached = self.redis.get(cache_key)
+        
+        if cached:
+            strategy_data = orjson.loads(cached)
+            strategy = MarketingStrategy(**strategy_data)
+        else:
+            strategies = self.rules_cache.get(RuleType.MARKETING, {})
+            strategy = strategies.get(account_size)
+            
+            if not strategy:
+                return None
+            
+            # Cache the strategy
+            self.redis.setex(cache_key, self.cache_ttl, orjson.dumps(strategy, default=str))
+        
+        # Customize based on creator categories if provided
+        if categories:
+            strategy = self._customize_strategy_for_categories(strategy, list(categories))
+        
+        return strategy
+    
     def _customize_strategy_for_categories(self, base_strategy: MarketingStrategy, categories: List[str]) -> MarketingStrategy:
         """Customize marketing strategy based on creator's content categories"""
         
-        # Category-specific adjustments
-        category_adjustments = {
-            "fitness": {
-                "content_schedule": {"instagram": +2, "tiktok": +1},
-                "engagement_tactics": ["workout_challenges", "transformation_posts"]
-            },
-            "lifestyle": {
-                "content_schedule": {"instagram": +1, "twitter": +2},
-                "engagement_tactics": ["day_in_life", "product_reviews"]
-            },
-            "adult": {
-                "content_schedule": {"onlyfans": +3},
-                "engagement_tactics": ["exclusive_content", "personalized_messages"]
-            }
-        }
-        
-        # Apply adjustments
-        customized = MarketingStrategy(**asdict(base_strategy))
+        # Apply adjustments to copies; strategies themselves are immutable
+        content_schedule = dict(base_strategy.content_schedule)
+        engagement_tactics = list(base_strategy.engagement_tactics)
         
         for category in categories:
-            if category in category_adjustments:
-                adjustments = category_adjustments[category]
+            if category in CATEGORY_ADJUSTMENTS:
+                adjustments = CATEGORY_ADJUSTMENTS[category]
                 
                 # Adjust content schedule
                 for platform, adjustment in adjustments.get("content_schedule", {}).items():
-                    if platform in customized.content_schedule:
-                        customized.content_schedule[platform] += adjustment
+                    if platform in content_schedule:
+                        content_schedule[platform] += adjustment
                 
                 # Add engagement tactics
-                customized.engagement_tactics.extend(adjustments.get("engagement_tactics", []))
+                engagement_tactics.extend(adjustments.get("engagement_tactics", []))
         
         # Remove duplicates and ensure reasonable limits
-        customized.engagement_tactics = list(set(customized.engagement_tactics))
-        
-        for platform in customized.content_schedule:
-            customized.content_schedule[platform] = min(customized.content_schedule[platform], 20)  # Max 20 posts/week
-        
-        return customized
+        return replace(
+            base_strategy,
+            content_schedule={
+                platform: min(posts, 20)  # Max 20 posts/week
+                for platform, posts in content_schedule.items()
+            },
+            engagement_tactics=list(set(engagement_tactics))
+        )
     
     def is_feature_enabled(self, feature_name: str, user_id: str = None) -> bool:
         """
@@ -350,15 +511,10 @@ class BusinessRulesEngine:
             True if feature is enabled for this user
         """
         try:
-            cache_key = self._get_cache_key(RuleType.FEATURE_FLAGS)
-            cached = self.redis.get(cache_key)
-            
-            if cached:
-                flags = json.loads(cached)
-            else:
-                flags = self.rules_cache.get(RuleType.FEATURE_FLAGS, {})
-                self.redis.setex(cache_key, self.cache_ttl, json.dumps(flags))
+            if feature_name not in self.rules_cache.get(RuleType.FEATURE_FLAGS, {}):
+                return False
             
+            flags = self._get_feature_flags()
             base_enabled = flags.get(feature_name, False)
             
             # Check for A/B testing rules
@@ -372,12 +528,56 @@ class BusinessRulesEngine:
             logger.error(f"Error checking feature flag {feature_name}: {str(e)}")
             return False
     
+    def are_features_enabled(self, feature_names: List[str], user_id: str = None) -> Dict[str, bool]:
+        """
+        Check several feature flags against a single read of the flag map
+        
+        Args:
+            feature_names: Names of the feature flags
+            user_id: Optional user ID for A/B testing
+            
+        Returns:
+            Dict of feature name -> enabled for this user
+        """
+        try:
+            flags = self._get_feature_flags()
+        except Exception as e:
+            logger.error(f"Error checking feature flags {feature_names}: {str(e)}")
+            return dict.fromkeys(feature_names, False)
+        
+        return {
+            name: bool(flags.get(name, False)) and (
+                not user_id or self._get_ab_test_result(name, user_id)
+            )
+            for name in feature_names
+        }
+    
+    def _get_feature_flags(self) -> Dict[str, bool]:
+        """Return the feature flag map, from the in-process cache when fresh"""
+        now = time.monotonic()
+        if self._flag_cache and self._flag_cache[0] > now:
+            return self._flag_cache[1]
+        
+        cache_key = self._get_cache_key(RuleType.FEATURE_FLAGS)
+        cached = self.redis.get(cache_key)
+        
+        if cached:
+            flags = orjson.loads(cached)
+        else:
+            flags = self.rules_cache.get(RuleType.FEATURE_FLAGS, {})
+            self.redis.setex(cache_key, self.cache_ttl, orjson.dumps(flags))
+        
+        self._flag_cache = (now + self.flag_cache_ttl, flags)
+        return flags
+    
     def _get_ab_test_result(self, feature_name: str, user_id: str) -> bool:
         """Determine A/B test result for user and feature"""
         
         # Simple hash-based A/B testing
         # In production, use more sophisticated A/B testing service
-        hash_value = hash(f"{feature_name}:{user_id}") % 100
+        # CRC32 is stable across processes (builtin hash() is salted per
+        # process); changing the hash re-buckets every user
+        hash_value = zlib.crc32(f"{feature_name}:{user_id}".encode("utf-8")) % 100
         
         # Get A/B testing configuration
         ab_config = self.rules_cache.get(RuleType.A_B_TESTING, {}).get(feature_name, {})
@@ -398,82 +598,151 @@ class BusinessRulesEngine:
             True if update successful
         """
         try:
+            base_version = self.version
+            # One timestamp shared by the backup key and the audit entry
+            now = datetime.utcnow()
+            
             # Validate rules data
             if not self._validate_rules_data(rule_type, rules_data):
                 logger.error(f"Invalid rules data for {rule_type}")
                 return False
             
-            # Create backup of current rules
-            self._backup_current_rules(rule_type, admin_user_id)
+            # Back up the current rules and bump the shared version in one
+            # round trip; Redis cache keys carry the version, so entries for
+            # the old rules are simply never read again and age out
+            pipe = self.redis.pipeline(transaction=False)
+            self._backup_current_rules(rule_type, admin_user_id, pipe, now)
+            pipe.incr(self.VERSION_KEY)
+            new_version = pipe.execute()[-1]
             
             # Update rules cache
-            self.rules_cache[rule_type] = rules_data
-            
-            # Clear Redis cache to force reload
-            pattern = self._get_cache_key(rule_type, "*")
-            keys = self.redis.keys(pattern)
-            if keys:
-                self.redis.delete(*keys)
-            
-            # Update version
-            new_version = f"{self.version.split('.')[0]}.{int(self.version.split('.')[1]) + 1}.0"
-            self.redis.set("ofm:rules:version", new_version)
+            self._swap_rules({rule_type: rules_data})
             self.version = new_version
+            self.clear_lookup_caches()
             
             # Persist to database
             self._persist_rules_to_db(rule_type, rules_data)
             
             # Audit log
-            self._log_rules_update(rule_type, admin_user_id, new_version)
+            self._log_rules_update(rule_type, admin_user_id, new_version, now)
             
             logger.info(f"Successfully updated {rule_type.value} rules to version {new_version}")
+            
+            # Broadcast to other workers (batched while deferred), carrying
+            # the new rules so in-step workers skip the DB reload
+            if self._sync_service:
+                self._sync_service.queue_update(
+                    rule_type.value,
+                    new_version,
+                    f"admin:{admin_user_id}",
+                    {"base_version": base_version, "rules": rules_data}
+                )
+            
             return True
             
         except Exception as e:
             logger.error(f"Failed to update rules: {str(e)}")
             return False
     
+    def refresh_rules(self, rule_type: str = None):
+        """
+        Reload rules from database
+        
+        Args:
+            rule_type: Rule type value to reload (all rules if omitted)
+        """
+        self.version = self._get_current_version()
+        
+        if not rule_type:
+            self._load_all_rules()
+            return
+        
+        loaders = {
+            RuleType.COMMISSION.value: self._load_commission_rules,
+            RuleType.MARKETING.value: self._load_marketing_strategies,
+            RuleType.FEATURE_FLAGS.value: self._load_feature_flags,
+        }
+        loader = loaders.get(rule_type)
+        if loader:
+            with self.db_session_factory() as db:
+                loader(db)
+    
+    def apply_rules_snapshot(self, rule_type: str, rules_data: Dict[str, Any], version: int):
+        """
+        Apply rules published by another worker without a database reload
+        
+        Args:
+            rule_type: Rule type value (e.g. "commission")
+            rules_data: Rules configuration as passed to update_rules
+            version: Version the sender moved to
+        """
+        rule_type = RuleType(rule_type)
+        self._swap_rules({rule_type: self._rules_from_snapshot(rule_type, rules_data)})
+        self.version = version
+        self.clear_lookup_caches()
+    
+    @staticmethod
+    def _rules_from_snapshot(rule_type: RuleType, rules_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Rebuild the rule objects the lookups expect from a decoded snapshot"""
+        if rule_type == RuleType.COMMISSION:
+            return {
+                tier: CommissionRule(**{
+                    **rule,
+                    "effective_date": _parse_datetime(rule["effective_date"]),
+                    "expires_date": _parse_datetime(rule.get("expires_date"))
+                })
+                for tier, rule in rules_data.items()
+            }
+        
+        if rule_type == RuleType.MARKETING:
+            # msgpack has no tuples; price ranges come back as lists
+            return {
+                account_size: MarketingStrategy(**{
+                    **strategy,
+                    "pricing_suggestions": {
+                        tier: tuple(prices) for tier, prices in strategy["pricing_suggestions"].items()
+                    }
+                })
+                for account_size, strategy in rules_data.items()
+            }
+        
+        return rules_data
+    
     def _validate_rules_data(self, rule_type: RuleType, rules_data: Dict[str, Any]) -> bool:
         """Validate rules data structure and values"""
+        validator = RULES_VALIDATORS.get(rule_type)
+        if validator is None:
+            return True
         
-        if rule_type == RuleType.COMMISSION:
-            for tier, rule_data in rules_data.items():
-                if not isinstance(rule_data, dict):
-                    return False
-                
-                required_fields = ["base_rate", "volume_thresholds", "min_rate", "max_rate"]
-                if not all(field in rule_data for field in required_fields):
-                    return False
-                
-                # Validate rate ranges
-                if not (0 <= rule_data["base_rate"] <= 1):
-                    return False
-                if not (0 <= rule_data["min_rate"] <= rule_data["max_rate"] <= 1):
-                    return False
-        
-        elif rule_type == RuleType.FEATURE_FLAGS:
-            if not isinstance(rules_data, dict):
-                return False
-            
-            # All feature flags should be boolean
-            if not all(isinstance(v, bool) for v in rules_data.values()):
-                return False
+        # The admin panel passes CommissionRule/MarketingStrategy objects
+        if isinstance(rules_data, dict):
+            rules_data = {
+                name: asdict(rule) if is_dataclass(rule) else rule
+                for name, rule in rules_data.items()
+            }
+        
+        try:
+            validator.validate_python(rules_data)
+        except ValidationError:
+            return False
         
         return True
     
-    def _backup_current_rules(self, rule_type: RuleType, admin_user_id: str):
-        """Create backup of current rules before update"""
-        backup_key = f"ofm:rules:backup:{rule_type.value}:{datetime.utcnow().isoformat()}"
+    def _backup_current_rules(self, rule_type: RuleType, admin_user_id: str, client=None,
+                              now: Optional[datetime] = None):
+        """Create backup of current rules before update (optionally on a pipeline)"""
+        backup_time = (now or datetime.utcnow()).isoformat()
+        backup_key = f"ofm:rules:backup:{rule_type.value}:{backup_time}"
         current_rules = self.rules_cache.get(rule_type, {})
         
         backup_data = {
             "rules": current_rules,
             "version": self.version,
             "admin_user_id": admin_user_id,
-            "backup_time": datetime.utcnow().isoformat()
+            "backup_time": backup_time
         }
         
-        self.redis.setex(backup_key, 86400 * 7, json.dumps(backup_data, default=str))  # 7 days retention
+        (client or self.redis).setex(backup_key, 86400 * 7, orjson.dumps(backup_data, default=str))  # 7 days retention
     
     def _persist_rules_to_db(self, rule_type: RuleType, rules_data: Dict[str, Any]):
         """Persist rules to database for durability"""
@@ -483,6 +752,8 @@ class BusinessRulesEngine:
                     from .business_rules_models import CommissionRuleModel
                     
                     for tier_name, rule_data in rules_data.items():
+                        if is_dataclass(rule_data):
+                            rule_data = asdict(rule_data)
                         existing = db.query(CommissionRuleModel).filter_by(tier_name=tier_name).first()
                         
                         if existing:
@@ -509,6 +780,8 @@ class BusinessRulesEngine:
                     from .business_rules_models import MarketingStrategyModel
                     
                     for account_size, strategy_data in rules_data.items():
+                        if is_dataclass(strategy_data):
+                            strategy_data = asdict(strategy_data)
                         existing = db.query(MarketingStrategyModel).filter_by(account_size=account_size).first()
                         
                         if existing:
@@ -564,10 +837,10 @@ class BusinessRulesEngine:
             from .business_rules_models import CommissionRuleModel
             
             rules = db.query(CommissionRuleModel).filter_by(is_active=True).all()
-            self.rules_cache[RuleType.COMMISSION] = {}
+            commission_rules = {}
             
             for rule in rules:
-                commission_rule = CommissionRule(
+                commission_rules[rule.tier_name] = CommissionRule(
                     tier=rule.tier_name,
                     base_rate=rule.base_rate,
                     volume_thresholds=rule.volume_thresholds,
@@ -576,8 +849,9 @@ class BusinessRulesEngine:
                     effective_date=rule.effective_date,
                     expires_date=rule.expires_date
                 )
-                self.rules_cache[RuleType.COMMISSION][rule.tier_name] = commission_rule
-                
+            
+            self._swap_rules({RuleType.COMMISSION: commission_rules})
+            self.clear_lookup_caches()
             logger.info(f"Loaded {len(rules)} commission rules from database")
             
         except Exception as e:
@@ -590,10 +864,10 @@ class BusinessRulesEngine:
             from .business_rules_models import MarketingStrategyModel
             
             strategies = db.query(MarketingStrategyModel).filter_by(is_active=True).all()
-            self.rules_cache[RuleType.MARKETING] = {}
+            marketing_strategies = {}
             
             for strategy in strategies:
-                marketing_strategy = MarketingStrategy(
+                marketing_strategies[strategy.account_size] = MarketingStrategy(
                     account_size=strategy.account_size,
                     pricing_suggestions=strategy.pricing_suggestions,
                     content_schedule=strategy.content_schedule,
@@ -601,8 +875,9 @@ class BusinessRulesEngine:
                     engagement_tactics=strategy.engagement_tactics,
                     priority_score=strategy.priority_score
                 )
-                self.rules_cache[RuleType.MARKETING][strategy.account_size] = marketing_strategy
-                
+            
+            self._swap_rules({RuleType.MARKETING: marketing_strategies})
+            self.clear_lookup_caches()
             logger.info(f"Loaded {len(strategies)} marketing strategies from database")
             
         except Exception as e:
@@ -620,66 +895,71 @@ class BusinessRulesEngine:
             from .business_rules_models import FeatureFlagModel
             
             flags = db.query(FeatureFlagModel).all()
-            self.rules_cache[RuleType.FEATURE_FLAGS] = {}
+            feature_flags = {}
+            ab_tests = {}
             
             for flag in flags:
-                self.rules_cache[RuleType.FEATURE_FLAGS][flag.feature_name] = flag.is_enabled
+                feature_flags[flag.feature_name] = flag.is_enabled
                 
                 # Store A/B test config if enabled
                 if flag.ab_test_enabled:
-                    if RuleType.A_B_TESTING not in self.rules_cache:
-                        self.rules_cache[RuleType.A_B_TESTING] = {}
-                    
-                    self.rules_cache[RuleType.A_B_TESTING][flag.feature_name] = {
+                    ab_tests[flag.feature_name] = {
                         "rollout_percentage": flag.rollout_percentage
                     }
-                    
+            
+            self._swap_rules({RuleType.FEATURE_FLAGS: feature_flags, RuleType.A_B_TESTING: ab_tests})
+            self._flag_cache = None
             logger.info(f"Loaded {len(flags)} feature flags from database")
             
         except Exception as e:
             logger.error(f"Failed to load feature flags from DB: {str(e)}")
             # Fall back to defaults loaded earlier
     
-    def _log_rules_update(self, rule_type: RuleType, admin_user_id: str, new_version: str):
+    def _log_rules_update(self, rule_type: RuleType, admin_user_id: str, new_version: int,
+                          now: Optional[datetime] = None):
         """Log rules update for audit trail"""
+        now = now or datetime.utcnow()
         audit_entry = {
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now.isoformat(),
             "rule_type": rule_type.value,
             "admin_user_id": admin_user_id,
             "version": new_version,
             "action": "update_rules"
         }
         
-        # Store in audit log (Redis + Database)
-        audit_key = f"ofm:audit:rules:{datetime.utcnow().strftime('%Y%m%d')}"
-        self.redis.lpush(audit_key, json.dumps(audit_entry))
-        self.redis.expire(audit_key, 86400 * 365)  # 1 year retention
+        # Store in audit log (Redis + Database); entries older than the
+        # retention window are trimmed as new ones are appended
+        fields = {"data": orjson.dumps(audit_entry)}
+        retention_minid = _stream_ms(now - timedelta(days=self.AUDIT_RETENTION_DAYS))
+        try:
+            # The entry ID carries the update's own time, so a get_audit_log
+            # window ending at `now` includes it
+            self.redis.xadd(
+                self.AUDIT_STREAM_KEY,
+                fields,
+                id=f"{_stream_ms(now)}-*",
+                minid=retention_minid,
+                approximate=True
+            )
+        except redis.ResponseError:
+            # Stream top is ahead of this worker's clock; take a server ID
+            self.redis.xadd(self.AUDIT_STREAM_KEY, fields, minid=retention_minid, approximate=True)
         
         logger.info(f"Audit logged: {audit_entry}")
     
-    def get_rules_version(self) -> str:
+    def get_rules_version(self) -> int:
         """Get current rules version"""
         return self.version
     
     def get_audit_log(self, start_date: datetime, end_date: datetime) -> List[Dict]:
-        """Get audit log entries for date range"""
-        audit_entries = []
-        
-        current_date = start_date
-        while current_date <= end_date:
-            audit_key = f"ofm:audit:rules:{current_date.strftime('%Y%m%d')}"
-            daily_entries = self.redis.lrange(audit_key, 0, -1)
-            
-            for entry_json in daily_entries:
-                entry = json.loads(entry_json)
-                entry_time = datetime.fromisoformat(entry["timestamp"])
-                
-                if start_date <= entry_time <= end_date:
-                    audit_entries.append(entry)
-            
-            current_date += timedelta(days=1)
-        
-        return sorted(audit_entries, key=lambda x: x["timestamp"])
+        """Get audit log entries for date range (naive UTC), oldest first"""
+        entries = self.redis.xrange(
+            self.AUDIT_STREAM_KEY,
+            min=_stream_ms(start_date),
+            max=_stream_ms(end_date)
+        )
+        # Field names are str on clients built with decode_responses=True
+        return [orjson.loads(fields.get(b"data") or fields["data"]) for _, fields in entries]
 
 
 # Singleton instance for application use
@@ -4,43 +4,90 @@ Database helper for admin panel
 Provides database session management for admin operations.
 """
 
+import os
+import threading
 from contextlib import contextmanager
-from sqlalchemy.orm import Session
-from typing import Generator
+import orjson
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Any, Generator, Optional
 
-# Import from your existing database module
+# Import from your existing database module; its db_service is only set
+# once init_database() runs, so it is read per call, never bound here
 try:
-    from payment.src.database import db_service
+    from payment.src import database as payment_database
 except ImportError:
-    # Fallback for development
-    db_service = None
+    payment_database = None
+
+# Connection pool for the onboarding database (Postgres/MySQL)
+DB_POOL_SIZE = 10
+DB_MAX_OVERFLOW = 20
+DB_POOL_RECYCLE = 3600  # seconds
+
+_session_factory: Optional[sessionmaker] = None
+_session_factory_lock = threading.Lock()
+
+
+def json_serializer(value: Any) -> str:
+    """Serialize JSON column values with orjson instead of the stdlib encoder"""
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode()
+
+
+def _get_session_factory() -> sessionmaker:
+    """
+    Session factory on a process-wide pooled engine for DATABASE_URL
+
+    Raises:
+        RuntimeError: If DATABASE_URL is not set
+    """
+    global _session_factory
+    if _session_factory is None:
+        with _session_factory_lock:
+            if _session_factory is None:
+                database_url = os.getenv("DATABASE_URL")
+                if not database_url:
+                    raise RuntimeError("DATABASE_URL is not set")
+
+                pool_options = {} if database_url.startswith("sqlite") else {
+                    "pool_size": DB_POOL_SIZE,
+                    "max_overflow": DB_MAX_OVERFLOW,
+                    "pool_recycle": DB_POOL_RECYCLE
+                }
+                engine = create_engine(
+                    database_url,
+                    pool_pre_ping=True,
+                    json_serializer=json_serializer,
+                    json_deserializer=orjson.loads,
+                    **pool_options
+                )
+                _session_factory = sessionmaker(bind=engine)
+    return _session_factory
 
 
 @contextmanager
 def get_db() -> Generator[Session, None, None]:
     """
     Get database session context manager
-    
+
+    Uses the payment db_service when it has been initialized in this
+    process, otherwise the onboarding engine for DATABASE_URL. Commits
+    when the block exits and rolls back on error.
+
     Yields:
         Database session
     """
+    db_service = payment_database.db_service if payment_database else None
     if db_service:
         with db_service.get_session() as session:
             yield session
-    else:
-        # Fallback implementation for testing
-        from sqlalchemy import create_engine
-        from sqlalchemy.orm import sessionmaker
-        
-        engine = create_engine("sqlite:///test.db")
-        SessionLocal = sessionmaker(bind=engine)
-        
-        session = SessionLocal()
-        try:
-            yield session
-            session.commit()
-        except Exception:
-            session.rollback()
-            raise
-        finally:
-            session.close()
\ No newline at end of file
+        return
+
+    session = _get_session_factory()()
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
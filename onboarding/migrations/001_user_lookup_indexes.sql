@@ -0,0 +1,27 @@
+-- Per-user lookup indexes for the onboarding service
+-- Matches the __table_args__ / index=True declarations in onboarding/models.py
+--
+-- Apply with: psql "$DATABASE_URL" -f onboarding/migrations/001_user_lookup_indexes.sql
+
+BEGIN;
+
+-- =============================================
+-- creator_profiles: covering unique index on user_id
+-- =============================================
+
+-- INCLUDE lets Postgres answer the narrow route queries with index-only scans
+CREATE UNIQUE INDEX IF NOT EXISTS ix_creator_profiles_user_id
+  ON creator_profiles (user_id)
+  INCLUDE (stripe_account_id, account_size, pricing_tier, timezone);
+
+-- The index above now enforces uniqueness, so the old constraint is redundant
+ALTER TABLE creator_profiles DROP CONSTRAINT IF EXISTS creator_profiles_user_id_key;
+
+-- =============================================
+-- onboarding_sessions: lookup by user_id
+-- =============================================
+
+CREATE INDEX IF NOT EXISTS ix_onboarding_sessions_user_id
+  ON onboarding_sessions (user_id);
+
+COMMIT;
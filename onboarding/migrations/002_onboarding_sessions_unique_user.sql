@@ -0,0 +1,40 @@
+-- One onboarding session per user
+-- Matches OnboardingSession.user_id (unique=True, index=True) in onboarding/models.py
+-- Run after 001_user_lookup_indexes.sql
+--
+-- Apply with: psql "$DATABASE_URL" -f onboarding/migrations/002_onboarding_sessions_unique_user.sql
+
+BEGIN;
+
+-- Block concurrent session inserts until the unique index exists
+LOCK TABLE onboarding_sessions IN SHARE ROW EXCLUSIVE MODE;
+
+-- =============================================
+-- Dedupe: keep the most advanced session per user
+-- =============================================
+
+-- Completed sessions win, then the most recently updated
+DELETE FROM onboarding_sessions s
+USING (
+  SELECT id,
+         row_number() OVER (
+           PARTITION BY user_id
+           ORDER BY completed DESC NULLS LAST,
+                    updated_at DESC NULLS LAST,
+                    started_at DESC NULLS LAST,
+                    id
+         ) AS rn
+  FROM onboarding_sessions
+) ranked
+WHERE s.id = ranked.id
+  AND ranked.rn > 1;
+
+-- =============================================
+-- Replace the plain user_id index with a unique one
+-- =============================================
+
+DROP INDEX IF EXISTS ix_onboarding_sessions_user_id;
+CREATE UNIQUE INDEX ix_onboarding_sessions_user_id
+  ON onboarding_sessions (user_id);
+
+COMMIT;
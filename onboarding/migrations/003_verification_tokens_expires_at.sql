@@ -0,0 +1,12 @@
+-- Index verification token expiry for the hourly cleanup task
+-- Matches VerificationToken.expires_at (index=True) in onboarding/models.py
+--
+-- Apply with: psql "$DATABASE_URL" -f onboarding/migrations/003_verification_tokens_expires_at.sql
+
+BEGIN;
+
+-- EmailTokenService.cleanup_expired_tokens deletes by expires_at
+CREATE INDEX IF NOT EXISTS ix_verification_tokens_expires_at
+  ON verification_tokens (expires_at);
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Stripe webhook events already applied by process_stripe_event
+-- Matches ProcessedStripeEvent in onboarding/models.py
+--
+-- Apply with: psql "$DATABASE_URL" -f onboarding/migrations/004_processed_stripe_events.sql
+
+BEGIN;
+
+-- The event_id primary key is the idempotency claim: redelivered events
+-- hit ON CONFLICT (event_id) DO NOTHING and are skipped
+CREATE TABLE IF NOT EXISTS processed_stripe_events (
+  event_id VARCHAR(255) PRIMARY KEY,
+  event_type VARCHAR(100) NOT NULL,
+  processed_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+COMMIT;
@@ -0,0 +1,23 @@
+-- Emails queued for background delivery by send_email_task
+-- Matches OutboundEmail in onboarding/models.py
+--
+-- Apply with: psql "$DATABASE_URL" -f onboarding/migrations/005_outbound_emails.sql
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS outbound_emails (
+  id VARCHAR(50) PRIMARY KEY,
+  kind VARCHAR(32) NOT NULL,
+  user_id VARCHAR(50) NOT NULL REFERENCES users(id),
+  payload JSON,  -- Cleared once sent or abandoned
+  sent_at TIMESTAMP,
+  created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc')
+);
+
+-- send_email_task claims by id AND sent_at IS NULL (primary key); the
+-- hourly purge finds unsent rows past the token TTL by created_at
+CREATE INDEX IF NOT EXISTS ix_outbound_emails_pending
+  ON outbound_emails (created_at)
+  WHERE sent_at IS NULL;
+
+COMMIT;
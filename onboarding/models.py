@@ -5,9 +5,9 @@ Implements secure token-based email verification, creator profiles,
 and onboarding session tracking for the pre-connection flow.
 """
 
-import uuid
+import secrets
 from datetime import datetime
-from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, JSON, Text
+from sqlalchemy import Column, String, Boolean, DateTime, ForeignKey, Index, JSON, Text, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -33,7 +33,7 @@ class VerificationToken(Base):
     id = Column(String(64), primary_key=True)  # SHA256 hash of raw token
     user_id = Column(String(50), ForeignKey("users.id"), nullable=False)
     purpose = Column(String(32), nullable=False, default="email_verify")
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Cleanup range scan
     used = Column(Boolean, default=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     
@@ -58,9 +58,19 @@ class CreatorProfile(Base):
     - Timezone (auto-detected from JS Intl API)
     """
     __tablename__ = "creator_profiles"
-    
-    id = Column(String(50), primary_key=True, default=lambda: f"cp_{uuid.uuid4().hex[:12]}")
-    user_id = Column(String(50), ForeignKey("users.id"), unique=True, nullable=False)
+    __table_args__ = (
+        # Unique lookup by user; INCLUDE lets Postgres serve the hot
+        # narrow-column route queries with index-only scans
+        Index(
+            "ix_creator_profiles_user_id",
+            "user_id",
+            unique=True,
+            postgresql_include=["stripe_account_id", "account_size", "pricing_tier", "timezone"],
+        ),
+    )
+    
+    id = Column(String(50), primary_key=True, default=lambda: f"cp_{secrets.token_hex(6)}")
+    user_id = Column(String(50), ForeignKey("users.id"), nullable=False)
     
     # Public profile information
     public_name = Column(String(100), nullable=True)  # Nom public affiché
@@ -119,8 +129,8 @@ class OnboardingSession(Base):
     """
     __tablename__ = "onboarding_sessions"
     
-    id = Column(String(50), primary_key=True, default=lambda: f"onb_{uuid.uuid4().hex[:16]}")
-    user_id = Column(String(50), ForeignKey("users.id"), nullable=False)
+    id = Column(String(50), primary_key=True, default=lambda: f"onb_{secrets.token_hex(8)}")
+    user_id = Column(String(50), ForeignKey("users.id"), nullable=False, unique=True, index=True)
     
     # State tracking
     current_step = Column(String(50), default="registered")
@@ -170,6 +180,46 @@ class OnboardingSession(Base):
             return 0
 
 
+class ProcessedStripeEvent(Base):
+    """
+    Stripe webhook events that have already been applied
+
+    Stripe delivers webhooks at least once, so the event ID is recorded
+    when processing starts and redelivered events are skipped.
+    """
+    __tablename__ = "processed_stripe_events"
+
+    event_id = Column(String(255), primary_key=True)  # Stripe event ID (evt_...)
+    event_type = Column(String(100), nullable=False)
+    processed_at = Column(DateTime, default=datetime.utcnow)
+
+
+class OutboundEmail(Base):
+    """
+    Email queued for background delivery
+    
+    Celery tasks carry only the row ID; the worker loads the payload,
+    sends, then marks the row sent and clears the payload so raw
+    verification tokens do not linger.
+    """
+    __tablename__ = "outbound_emails"
+    __table_args__ = (
+        # Pending rows only: the maintenance purge scans unsent emails by age
+        Index(
+            "ix_outbound_emails_pending",
+            "created_at",
+            postgresql_where=text("sent_at IS NULL"),
+        ),
+    )
+    
+    id = Column(String(50), primary_key=True, default=lambda: f"em_{secrets.token_hex(8)}")
+    kind = Column(String(32), nullable=False)  # "verification"
+    user_id = Column(String(50), ForeignKey("users.id"), nullable=False)
+    payload = Column(JSON, nullable=True)  # Cleared once sent
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 # User model extensions (if needed)
 # Assumes existing User model has these fields added:
 # - email_verified: Boolean (default=False)  
@@ -68,10 +68,11 @@ class OnlyFansQuestionnaire:
     }
     
     # Content category mappings
-    VALID_CATEGORIES = {
+    VALID_CATEGORIES = frozenset({
         'lifestyle', 'fitness', 'adult', 'fashion', 'art', 
         'music', 'gaming', 'education', 'comedy', 'other'
-    }
+    })
+    SORTED_CATEGORIES = tuple(sorted(VALID_CATEGORIES))  # Stable order for API responses
     
     @classmethod
     def validate_questionnaire(cls, data: Dict[str, Any]) -> Tuple[bool, Optional[str]]:
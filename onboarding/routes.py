@@ -11,21 +11,32 @@ All routes implement proper error handling, rate limiting, and security validati
 """
 
 import logging
-from typing import Dict, Any
+import stripe
+from typing import Any, ContextManager, Dict
 from flask import Blueprint, request, jsonify, current_app
 from functools import wraps
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 
+from .db_helper import get_db
+from .models import CreatorProfile, OnboardingSession
+from .schemas import RegisterIn, VerifyEmailIn, StripeConnectIn, TimezoneIn
+from .onlyfans_questionnaire import OnlyFansQuestionnaire
 from .service import OnboardingService, OnboardingError
 from .stripe_connect import StripeConnectService, StripeConnectError, WebhookHandler
 from .tokens import EmailTokenService
 from .business_rules import get_rules_engine
+from .tasks.webhooks import process_stripe_event
 
 # Blueprint setup
 bp = Blueprint("onboarding", __name__, url_prefix="/api/v1")
 onboarding_service = OnboardingService()
 logger = logging.getLogger(__name__)
 
+# Stripe event payloads are a few KB; anything near this is not a real webhook
+MAX_WEBHOOK_PAYLOAD_BYTES = 1_000_000
+
 # Error response helpers
 def error_response(message: str, code: int = 400, details: Dict = None) -> tuple:
     """Standard error response format"""
@@ -66,19 +77,46 @@ def require_auth(roles=None):
         return decorated_function
     return decorator
 
-# Database session helper (placeholder - implement with your DB service)
-def get_db_session() -> Session:
-    """Get database session - integrate with your existing DB service"""
-    # This is a placeholder - replace with your database session factory
-    # from marketing.backend.api.src.database import db_service
-    # return db_service.get_session()
-    raise NotImplementedError("Implement database session factory")
+# Request body validation decorator
+def validate_body(model: type[BaseModel]):
+    """
+    Parse and validate the JSON request body against a pydantic model
+    
+    The validated model is passed to the route as the ``body`` keyword
+    argument. Invalid bodies are rejected with 422 and per-field errors.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                body = model.model_validate_json(request.get_data())
+            except ValidationError as e:
+                errors = [
+                    {"field": ".".join(str(part) for part in err["loc"]), "message": err["msg"]}
+                    for err in e.errors(include_url=False)
+                ]
+                return error_response("Invalid request body", 422, {"errors": errors})
+            
+            return f(*args, body=body, **kwargs)
+        return decorated_function
+    return decorator
+
+# Database session helper
+def get_db_session() -> ContextManager[Session]:
+    """
+    Get database session context manager
+    
+    Commits once when the block exits and rolls back on error, so routes
+    only mutate ORM objects and never call commit() themselves.
+    """
+    return get_db()
 
 
 # === AUTHENTICATION ROUTES ===
 
 @bp.route("/auth/register", methods=["POST"])
-def register():
+@validate_body(RegisterIn)
+def register(body: RegisterIn):
     """
     Register new user and start onboarding
     
@@ -88,22 +126,11 @@ def register():
         
     Returns:
         201: Registration successful, verification email sent
-        400: Validation errors
         409: User already exists
+        422: Validation errors
     """
     try:
-        data = request.get_json()
-        if not data:
-            return error_response("Request body required")
-        
-        email = data.get("email", "").strip().lower()
-        password = data.get("password", "")
-        
-        # Validation
-        if not email or "@" not in email:
-            return error_response("Valid email address required")
-        if len(password) < 8:
-            return error_response("Password must be at least 8 characters")
+        email = body.email
         
         with get_db_session() as db:
             # Check if user exists (implement with your User model)
@@ -139,7 +166,8 @@ def register():
 
 
 @bp.route("/auth/verify-email", methods=["POST"])
-def verify_email():
+@validate_body(VerifyEmailIn)
+def verify_email(body: VerifyEmailIn):
     """
     Verify email address with token
     
@@ -150,20 +178,11 @@ def verify_email():
     Returns:
         200: Email verified successfully
         400: Invalid or expired token
+        422: Missing user ID or token
     """
     try:
-        data = request.get_json()
-        if not data:
-            return error_response("Request body required")
-        
-        user_id = data.get("user_id")
-        token = data.get("token")
-        
-        if not user_id or not token:
-            return error_response("User ID and token required")
-        
         with get_db_session() as db:
-            success = onboarding_service.verify_email(db, user_id, token)
+            success = onboarding_service.verify_email(db, body.user_id, body.token)
             
             if success:
                 return success_response(message="Email verified successfully")
@@ -243,7 +262,8 @@ def accept_terms():
 
 @bp.route("/stripe/connect/start", methods=["POST"])
 @require_auth(["creator"])
-def stripe_connect_start():
+@validate_body(StripeConnectIn)
+def stripe_connect_start(body: StripeConnectIn):
     """
     Start Stripe Connect Express onboarding
     
@@ -253,22 +273,12 @@ def stripe_connect_start():
         
     Returns:
         200: Onboarding URL created
-        400: Missing required parameters
+        422: Missing required parameters
     """
     try:
-        data = request.get_json()
-        if not data:
-            return error_response("Request body required")
-        
-        return_url = data.get("return_url")
-        refresh_url = data.get("refresh_url")
-        
-        if not return_url or not refresh_url:
-            return error_response("return_url and refresh_url required")
-        
         with get_db_session() as db:
             onboarding_url = onboarding_service.start_stripe_onboarding(
-                db, request.user_id, request.user_email, return_url, refresh_url
+                db, request.user_id, request.user_email, body.return_url, body.refresh_url
             )
             
             response_data = {
@@ -287,7 +297,8 @@ def stripe_connect_start():
 
 @bp.route("/stripe/connect/refresh", methods=["POST"])
 @require_auth(["creator"])
-def stripe_connect_refresh():
+@validate_body(StripeConnectIn)
+def stripe_connect_refresh(body: StripeConnectIn):
     """
     Refresh expired Stripe onboarding link
     
@@ -297,29 +308,22 @@ def stripe_connect_refresh():
         
     Returns:
         200: New onboarding URL created
+        422: Missing required parameters
     """
     try:
-        data = request.get_json()
-        if not data:
-            return error_response("Request body required")
-        
-        return_url = data.get("return_url")
-        refresh_url = data.get("refresh_url") 
-        
-        if not return_url or not refresh_url:
-            return error_response("return_url and refresh_url required")
-        
         with get_db_session() as db:
             # Get existing Stripe account ID
-            from .models import CreatorProfile
-            profile = db.query(CreatorProfile).filter_by(user_id=request.user_id).first()
+            account_id = db.execute(
+                select(CreatorProfile.stripe_account_id)
+                .where(CreatorProfile.user_id == request.user_id)
+            ).scalar_one_or_none()
             
-            if not profile or not profile.stripe_account_id:
+            if not account_id:
                 return error_response("Stripe account not found", 404)
             
             # Create new account link
             onboarding_url = StripeConnectService.create_onboarding_link(
-                profile.stripe_account_id, return_url, refresh_url
+                account_id, body.return_url, body.refresh_url
             )
             
             response_data = {"onboarding_url": onboarding_url}
@@ -340,10 +344,13 @@ def stripe_connect_return():
     
     Returns:
         200: Onboarding status and next steps
+        202: Another request is already processing this return
     """
     try:
         with get_db_session() as db:
             result = onboarding_service.handle_stripe_return(db, request.user_id)
+            if result.get("status") == "processing":
+                return success_response(result), 202
             return success_response(result)
             
     except Exception as e:
@@ -363,21 +370,24 @@ def stripe_status():
     """
     try:
         with get_db_session() as db:
-            from .models import CreatorProfile
-            profile = db.query(CreatorProfile).filter_by(user_id=request.user_id).first()
+            account_id = db.execute(
+                select(CreatorProfile.stripe_account_id)
+                .where(CreatorProfile.user_id == request.user_id)
+            ).scalar_one_or_none()
             
-            if not profile or not profile.stripe_account_id:
+            if not account_id:
                 return error_response("Stripe account not found", 404)
             
-            status = StripeConnectService.get_account_status(profile.stripe_account_id)
-            progress, message = StripeConnectService.get_onboarding_progress(profile.stripe_account_id)
+            # One Stripe read; progress and completion derive from it
+            status = StripeConnectService.get_account_status(account_id)
+            is_complete, progress, message, _ = StripeConnectService.compute_status(status)
             
             response_data = {
-                "account_id": profile.stripe_account_id,
+                "account_id": account_id,
                 "status": status,
                 "progress": progress,
                 "progress_message": message,
-                "is_complete": StripeConnectService.is_onboarding_complete(profile.stripe_account_id)
+                "is_complete": is_complete
             }
             
             return success_response(response_data)
@@ -401,15 +411,15 @@ def stripe_dashboard_link():
     """
     try:
         with get_db_session() as db:
-            from .models import CreatorProfile
-            profile = db.query(CreatorProfile).filter_by(user_id=request.user_id).first()
+            account_id = db.execute(
+                select(CreatorProfile.stripe_account_id)
+                .where(CreatorProfile.user_id == request.user_id)
+            ).scalar_one_or_none()
             
-            if not profile or not profile.stripe_account_id:
+            if not account_id:
                 return error_response("Stripe account not found", 404)
             
-            dashboard_url = StripeConnectService.create_dashboard_login_link(
-                profile.stripe_account_id
-            )
+            dashboard_url = StripeConnectService.create_dashboard_login_link(account_id)
             
             response_data = {
                 "dashboard_url": dashboard_url,
@@ -448,7 +458,8 @@ def onboarding_status():
 
 @bp.route("/onboarding/update-timezone", methods=["POST"])
 @require_auth()
-def update_timezone():
+@validate_body(TimezoneIn)
+def update_timezone(body: TimezoneIn):
     """
     Update timezone from client-side JavaScript detection
     
@@ -457,18 +468,11 @@ def update_timezone():
         
     Returns:
         200: Timezone updated
+        422: Timezone missing
     """
     try:
-        data = request.get_json()
-        if not data:
-            return error_response("Request body required")
-        
-        client_timezone = data.get("timezone")
-        if not client_timezone:
-            return error_response("Timezone required")
-        
         with get_db_session() as db:
-            onboarding_service.update_client_timezone(db, request.user_id, client_timezone)
+            onboarding_service.update_client_timezone(db, request.user_id, body.timezone)
             return success_response(message="Timezone updated")
             
     except Exception as e:
@@ -478,7 +482,8 @@ def update_timezone():
 
 @bp.route("/onboarding/<session_id>/timezone", methods=["POST"])
 @require_auth(['creator'])
-def update_timezone_by_session(session_id):
+@validate_body(TimezoneIn)
+def update_timezone_by_session(session_id, body: TimezoneIn):
     """
     Update timezone from client-side for specific onboarding session
     
@@ -491,19 +496,10 @@ def update_timezone_by_session(session_id):
     Returns:
         200: Timezone updated successfully
         404: Session not found
+        422: Timezone missing
     """
     try:
-        data = request.get_json()
-        if not data:
-            return error_response("Request body required")
-        
-        client_timezone = data.get("timezone")
-        if not client_timezone:
-            return error_response("Timezone required")
-        
         with get_db_session() as db:
-            from .models import OnboardingSession, CreatorProfile
-            
             # Verify session belongs to user
             session = db.query(OnboardingSession).filter_by(
                 id=session_id,
@@ -516,8 +512,7 @@ def update_timezone_by_session(session_id):
             # Update creator profile timezone
             profile = db.query(CreatorProfile).filter_by(user_id=request.user_id).first()
             if profile:
-                profile.timezone = onboarding_service.LocaleDetectionService.normalize_timezone(client_timezone)
-                db.commit()
+                profile.timezone = onboarding_service.LocaleDetectionService.normalize_timezone(body.timezone)
                 
                 return success_response({
                     "timezone": profile.timezone,
@@ -542,9 +537,13 @@ def get_pricing_suggestions():
     """
     try:
         with get_db_session() as db:
-            from .models import CreatorProfile
-            
-            profile = db.query(CreatorProfile).filter_by(user_id=request.user_id).first()
+            profile = db.execute(
+                select(
+                    CreatorProfile.account_size,
+                    CreatorProfile.pricing_tier,
+                    CreatorProfile.content_categories
+                ).where(CreatorProfile.user_id == request.user_id)
+            ).one_or_none()
             if not profile:
                 return error_response("Creator profile not found", 404)
             
@@ -592,9 +591,10 @@ def get_commission_rate():
         monthly_volume = request.args.get("monthly_volume", 0, type=float)
         
         with get_db_session() as db:
-            from .models import CreatorProfile
-            
-            profile = db.query(CreatorProfile).filter_by(user_id=request.user_id).first()
+            profile = db.execute(
+                select(CreatorProfile.pricing_tier)
+                .where(CreatorProfile.user_id == request.user_id)
+            ).one_or_none()
             if not profile:
                 return error_response("Creator profile not found", 404)
             
@@ -635,46 +635,35 @@ def stripe_webhook():
     """
     Handle Stripe Connect webhooks
     
-    Processes account.updated and other relevant events to sync
-    onboarding status with Stripe account changes.
+    Verifies the signature and enqueues the event; account.updated and
+    other relevant events are applied by a background worker.
     
     Returns:
-        200: Webhook processed
+        200: Webhook accepted
         400: Invalid signature or payload
+        413: Payload too large
     """
     try:
-        payload = request.get_data()
+        # Reject oversized bodies before buffering them
+        if request.content_length and request.content_length > MAX_WEBHOOK_PAYLOAD_BYTES:
+            return error_response("Payload too large", 413)
+
         signature = request.headers.get("Stripe-Signature")
-        
         if not signature:
             return error_response("Missing Stripe signature", 400)
-        
-        # Verify webhook signature
-        if not WebhookHandler.verify_webhook_signature(payload, signature):
-            return error_response("Invalid webhook signature", 400)
-        
-        # Parse webhook event
-        import json
-        import stripe
-        
+
+        # Hash the body as it streams in; it is only parsed once verified
         try:
-            event = stripe.Event.construct_from(
-                json.loads(payload), stripe.api_key
-            )
+            event = WebhookHandler.construct_webhook_event_from_stream(request.stream, signature)
+        except stripe.SignatureVerificationError:
+            return error_response("Invalid webhook signature", 400)
         except ValueError:
             return error_response("Invalid payload", 400)
-        
-        # Process event
-        with get_db_session() as db:
-            success = WebhookHandler.handle_webhook_event(
-                event.type, event.data, db
-            )
-            
-            if success:
-                return jsonify({"received": True})
-            else:
-                return error_response("Webhook processing failed", 500)
-                
+
+        # Acknowledge immediately; a worker applies the event
+        process_stripe_event.delay(event.id, event.type, event.data.to_dict_recursive())
+        return jsonify({"received": True})
+
     except Exception as e:
         logger.error(f"Webhook processing failed: {str(e)}")
         return error_response("Webhook processing failed", 500)
@@ -705,8 +694,6 @@ def submit_onlyfans_questionnaire():
         400: Invalid questionnaire data
     """
     try:
-        from .onlyfans_questionnaire import OnlyFansQuestionnaire
-        
         data = request.get_json()
         if not data:
             return error_response("Request body required")
@@ -721,14 +708,11 @@ def submit_onlyfans_questionnaire():
         
         # Update creator profile with results
         with get_db_session() as db:
-            from .models import CreatorProfile
-            
             profile = db.query(CreatorProfile).filter_by(user_id=request.user_id).first()
             if profile:
                 profile.account_size = analysis_results["account_size"]
                 profile.pricing_tier = analysis_results["pricing_tier"]
                 profile.content_categories = analysis_results["content_categories"]
-                db.commit()
                 
                 logger.info(f"Updated profile from questionnaire for user {request.user_id}")
             
@@ -783,8 +767,6 @@ def get_questionnaire_template():
         200: Questionnaire template and metadata
     """
     try:
-        from .onlyfans_questionnaire import OnlyFansQuestionnaire
-        
         template = {
             "required_fields": {
                 "follower_count": {
@@ -813,7 +795,7 @@ def get_questionnaire_template():
                 "content_categories": {
                     "type": "array",
                     "description": "Catégories de contenu",
-                    "allowed_values": list(OnlyFansQuestionnaire.VALID_CATEGORIES)
+                    "allowed_values": list(OnlyFansQuestionnaire.SORTED_CATEGORIES)
                 }
             },
             "optional_fields": {
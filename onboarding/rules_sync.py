@@ -1,35 +1,81 @@
 """
 Business rules synchronization service
 
-Provides Redis pub/sub mechanism to synchronize business rules
-across multiple worker instances in a distributed environment.
+Provides a Redis stream to synchronize business rules across
+multiple worker instances in a distributed environment.
 """
 
-import json
 import logging
+import queue
 import threading
-from typing import Dict, Any, Callable, Optional
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, is_dataclass
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
 from datetime import datetime
+import msgpack
+import orjson
 import redis
-from redis.client import PubSub
 
 logger = logging.getLogger(__name__)
 
+# (epoch second, ISO string) so broadcasts format a timestamp at most once per second
+_ts_cache = (0, "")
+
+
+def _now_iso() -> str:
+    """Current UTC time as ISO 8601, at one-second resolution"""
+    global _ts_cache
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache = (now, datetime.utcfromtimestamp(now).isoformat())
+    return _ts_cache[1]
+
+
+def _encode(value: Any) -> Any:
+    """msgpack hook for the non-native types rule snapshots contain"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} in a sync message")
+
+
+def _pack(payload: dict) -> bytes:
+    """Encode a sync message body as msgpack; unsupported types raise TypeError"""
+    return msgpack.packb(payload, use_bin_type=True, default=_encode)
+
+
+def _unpack(data: bytes, wire_format) -> Any:
+    """Decode a sync message body; entries without a format are JSON from older workers"""
+    if wire_format in (b"msgpack", "msgpack"):
+        return msgpack.unpackb(data, raw=False)
+    return orjson.loads(data)
+
 
 class RulesSyncService:
     """
     Service for synchronizing business rules across distributed workers
     
-    Uses Redis pub/sub to broadcast rule updates and ensure all
-    instances have the latest configuration without restart.
+    Appends rule updates to a Redis stream that every instance reads
+    with its own cursor, so all workers get the latest configuration
+    without restart and a worker that briefly loses its connection
+    replays what it missed.
     """
     
-    CHANNEL_PREFIX = "ofm:rules:sync:"
-    CHANNELS = {
-        "update": "ofm:rules:sync:update",
-        "refresh": "ofm:rules:sync:refresh",
-        "rollback": "ofm:rules:sync:rollback"
-    }
+    STREAM_KEY = "ofm:rules:sync:stream"
+    STREAM_MAXLEN = 10000  # Approximate cap on retained sync messages
+    READ_COUNT = 64
+    READ_BLOCK_MS = 1000
+    QUEUE_MAXSIZE = 1024
+    MAX_SNAPSHOT_BYTES = 64 * 1024  # Larger rule sets are reloaded from the DB instead
+    COALESCED_TYPES = frozenset({"update", "refresh"})
+    
+    # Fixed instance layout: no per-instance __dict__ on the listener hot path
+    __slots__ = (
+        "redis", "rules_engine", "last_id", "listener_thread", "dispatch_thread",
+        "is_running", "callbacks", "_queue", "_instance_id", "_deferred",
+        "_publisher", "_publish_lock",
+    )
     
     def __init__(self, redis_client: redis.Redis, rules_engine=None):
         """
@@ -41,11 +87,26 @@ class RulesSyncService:
         """
         self.redis = redis_client
         self.rules_engine = rules_engine
-        self.pubsub: Optional[PubSub] = None
+        self.last_id: Optional[str] = None
         self.listener_thread: Optional[threading.Thread] = None
+        self.dispatch_thread: Optional[threading.Thread] = None
         self.is_running = False
         self.callbacks: Dict[str, Callable] = {}
         
+        # Listener only enqueues; a single dispatcher parses and runs callbacks
+        # in arrival order so slow rule reloads never stall the subscriber
+        self._queue: queue.Queue = queue.Queue(maxsize=self.QUEUE_MAXSIZE)
+        
+        # Tags outgoing messages so this worker can ignore its own updates
+        self._instance_id = uuid.uuid4().hex
+        
+        # Per-thread buffer of update broadcasts while deferred
+        self._deferred = threading.local()
+        
+        # Dedicated publisher connection, opened on first publish
+        self._publisher: Optional[redis.Redis] = None
+        self._publish_lock = threading.Lock()
+        
         # Register default callbacks
         self._register_default_callbacks()
     
@@ -62,12 +123,10 @@ class RulesSyncService:
             return
         
         try:
-            # Create pubsub instance
-            self.pubsub = self.redis.pubsub()
-            
-            # Subscribe to channels
-            for channel in self.CHANNELS.values():
-                self.pubsub.subscribe(channel)
+            # Rules were just loaded from the database, so only read entries
+            # added after the current tail of the stream
+            latest = self.redis.xrevrange(self.STREAM_KEY, count=1)
+            self.last_id = latest[0][0] if latest else "0-0"
             
             # Start listener thread
             self.is_running = True
@@ -77,6 +136,12 @@ class RulesSyncService:
             )
             self.listener_thread.start()
             
+            self.dispatch_thread = threading.Thread(
+                target=self._dispatch_messages,
+                daemon=True
+            )
+            self.dispatch_thread.start()
+            
             logger.info("Rules sync service started")
             
         except Exception as e:
@@ -90,60 +155,151 @@ class RulesSyncService:
         
         self.is_running = False
         
-        if self.pubsub:
-            self.pubsub.unsubscribe()
-            self.pubsub.close()
+        # Listener and dispatcher poll is_running at least once per second
+        for thread in (self.listener_thread, self.dispatch_thread):
+            if thread and thread.is_alive():
+                thread.join(timeout=5)
         
-        if self.listener_thread and self.listener_thread.is_alive():
-            self.listener_thread.join(timeout=5)
+        with self._publish_lock:
+            if self._publisher:
+                self._publisher.close()
+                self._publisher = None
         
         logger.info("Rules sync service stopped")
     
+    def _publish(self, message_type: str, payload: bytes):
+        """Append to the stream on the service's long-lived connection"""
+        with self._publish_lock:
+            if self._publisher is None:
+                self._publisher = redis.Redis(
+                    connection_pool=self.redis.connection_pool,
+                    single_connection_client=True
+                )
+            self._publisher.xadd(
+                self.STREAM_KEY,
+                {"type": message_type, "format": "msgpack", "data": payload},
+                maxlen=self.STREAM_MAXLEN,
+                approximate=True
+            )
+    
     def _listen_for_messages(self):
-        """Listen for messages in background thread"""
-        try:
-            for message in self.pubsub.listen():
-                if not self.is_running:
-                    break
-                
-                # Skip subscription confirmations
-                if message['type'] not in ['message', 'pmessage']:
-                    continue
+        """Read stream entries in background thread"""
+        # Loop-invariant lookups bound once as locals
+        xread = self.redis.xread
+        process = self._process_message
+        stream_key, count, block = self.STREAM_KEY, self.READ_COUNT, self.READ_BLOCK_MS
+        last_id = self.last_id
+        
+        while self.is_running:
+            try:
+                # Bounded block so stop() takes effect within a second
+                response = xread({stream_key: last_id}, count=count, block=block)
                 
-                self._process_message(message)
+                for _stream, entries in response or []:
+                    for entry_id, fields in entries:
+                        process(fields)
+                        last_id = self.last_id = entry_id
                 
-        except Exception as e:
-            logger.error(f"Error in rules sync listener: {str(e)}")
-            self.is_running = False
+            except Exception as e:
+                # Cursor is kept, so entries added meanwhile are replayed
+                logger.error(f"Error in rules sync listener: {str(e)}")
+                time.sleep(1)
     
-    def _process_message(self, message: dict):
-        """Process incoming sync message"""
+    def _process_message(self, fields: dict):
+        """Queue incoming sync message for the dispatcher thread"""
+        get = fields.get
+        message_type = get(b"type", get("type"))
+        if isinstance(message_type, bytes):
+            message_type = message_type.decode()
+        
+        item = (message_type, get(b"data", get("data")), get(b"format", get("format")))
         try:
-            channel = message['channel'].decode() if isinstance(message['channel'], bytes) else message['channel']
-            data = message['data']
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Drop the oldest message rather than fall behind the stream
+            try:
+                dropped_type = self._queue.get_nowait()[0]
+                logger.warning(f"Rules sync queue full, dropped {dropped_type} message")
+            except queue.Empty:
+                pass
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                # Refilled by another put between the get and this one
+                logger.warning(f"Rules sync queue full, dropped {message_type} message")
+    
+    def _dispatch_messages(self):
+        """Run callbacks for queued messages in background thread"""
+        while self.is_running:
+            try:
+                batch = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                continue
             
-            # Parse JSON data
-            if isinstance(data, bytes):
-                data = data.decode()
+            # Drain whatever else has arrived so a burst is handled in one pass
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
             
-            payload = json.loads(data)
+            # Nothing raised here may end the thread, or updates stop applying
+            try:
+                for message_type, payload in self._coalesce(batch):
+                    self._dispatch(message_type, payload)
+            except Exception:
+                logger.exception("Error dispatching rules sync messages")
+    
+    def _coalesce(self, batch: List[Tuple[str, Any, Any]]) -> List[Tuple[str, dict]]:
+        """
+        Parse a batch of queued messages and collapse redundant reloads
+        
+        Update and refresh messages reload state from the database, so only
+        the last one per (message type, rule type) in the batch is kept.
+        Rollbacks are always kept.
+        """
+        messages = []
+        for message_type, data, wire_format in batch:
+            try:
+                payload = _unpack(data, wire_format)
+            except Exception:
+                # Malformed or missing data field
+                logger.exception(f"Undecodable sync message: {data!r}")
+                continue
             
-            # Determine message type
-            message_type = None
-            for msg_type, chan in self.CHANNELS.items():
-                if channel == chan:
-                    message_type = msg_type
-                    break
+            if not isinstance(payload, dict):
+                logger.error(f"Unexpected sync message payload: {data}")
+                continue
             
+            messages.append((message_type, payload))
+        
+        last_index = {}
+        for index, (message_type, payload) in enumerate(messages):
+            if message_type in self.COALESCED_TYPES:
+                last_index[(message_type, payload.get("rule_type"))] = index
+        
+        coalesced = [
+            (message_type, payload)
+            for index, (message_type, payload) in enumerate(messages)
+            if message_type not in self.COALESCED_TYPES
+            or last_index[(message_type, payload.get("rule_type"))] == index
+        ]
+        
+        if len(coalesced) < len(messages):
+            logger.debug(f"Coalesced {len(messages)} sync messages into {len(coalesced)}")
+        
+        return coalesced
+    
+    def _dispatch(self, message_type: str, payload: dict):
+        """Invoke the registered callback for a parsed sync message"""
+        try:
             if message_type and message_type in self.callbacks:
                 self.callbacks[message_type](payload)
             else:
-                logger.warning(f"Unknown message type for channel {channel}")
+                logger.warning(f"Unknown sync message type {message_type!r}")
                 
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON in sync message: {data}")
-        except Exception as e:
-            logger.error(f"Error processing sync message: {str(e)}")
+        except Exception:
+            logger.exception(f"Error processing {message_type} sync message")
     
     def _handle_rules_update(self, payload: dict):
         """Handle rules update notification"""
@@ -153,9 +309,23 @@ class RulesSyncService:
             timestamp = payload.get('timestamp')
             initiator = payload.get('initiator')
             
+            if payload.get('sender') == self._instance_id:
+                # update_rules already applied this change locally
+                return
+            
             logger.info(f"Received rules update: type={rule_type}, version={version}, from={initiator}")
             
             if self.rules_engine:
+                rules = payload.get('rules')
+                if rules is not None and payload.get('base_version') == self.rules_engine.get_rules_version():
+                    # In step with the sender: apply the published rules directly
+                    try:
+                        self.rules_engine.apply_rules_snapshot(rule_type, rules, version)
+                        logger.info(f"Applied {rule_type} rules snapshot at version {version}")
+                        return
+                    except Exception:
+                        logger.exception(f"Unusable {rule_type} rules snapshot, reloading from database")
+                
                 # Refresh specific rule type from database
                 self.rules_engine.refresh_rules(rule_type)
                 logger.info(f"Refreshed {rule_type} rules to version {version}")
@@ -199,7 +369,13 @@ class RulesSyncService:
         except Exception as e:
             logger.error(f"Error handling rules rollback: {str(e)}")
     
-    def broadcast_update(self, rule_type: str, version: str, initiator: str = "system"):
+    def broadcast_update(
+        self,
+        rule_type: str,
+        version: int,
+        initiator: str = "system",
+        snapshot: Optional[Dict[str, Any]] = None
+    ):
         """
         Broadcast rules update notification to all workers
         
@@ -207,25 +383,138 @@ class RulesSyncService:
             rule_type: Type of rules updated
             version: New version number
             initiator: Who initiated the update
+            snapshot: Optional {"base_version", "rules"} so in-step workers
+                can apply the change without a database reload
         """
         try:
-            payload = {
-                "rule_type": rule_type,
-                "version": version,
-                "timestamp": datetime.utcnow().isoformat(),
-                "initiator": initiator
-            }
-            
-            self.redis.publish(
-                self.CHANNELS["update"],
-                json.dumps(payload)
+            payload = self._update_payload(
+                rule_type, version, initiator, _now_iso(), snapshot
             )
             
+            self._publish("update", payload)
+            
             logger.info(f"Broadcasted rules update: {rule_type} v{version}")
             
         except Exception as e:
             logger.error(f"Failed to broadcast rules update: {str(e)}")
     
+    def broadcast_updates_bulk(
+        self,
+        items: List[Tuple[str, str, Optional[Dict[str, Any]]]],
+        initiator: str = "system"
+    ):
+        """
+        Broadcast several rules update notifications in one round trip
+        
+        Args:
+            items: (rule_type, version, snapshot) entries to announce
+            initiator: Who initiated the updates
+        """
+        if not items:
+            return
+        
+        try:
+            timestamp = _now_iso()
+            pipe = self.redis.pipeline(transaction=False)
+            
+            for rule_type, version, snapshot in items:
+                pipe.xadd(
+                    self.STREAM_KEY,
+                    {
+                        "type": "update",
+                        "format": "msgpack",
+                        "data": self._update_payload(rule_type, version, initiator, timestamp, snapshot)
+                    },
+                    maxlen=self.STREAM_MAXLEN,
+                    approximate=True
+                )
+            
+            pipe.execute()
+            
+            logger.info(f"Broadcasted {len(items)} rules updates")
+            
+        except Exception as e:
+            logger.error(f"Failed to broadcast rules updates: {str(e)}")
+    
+    def _update_payload(
+        self,
+        rule_type: str,
+        version: int,
+        initiator: str,
+        timestamp: str,
+        snapshot: Optional[Dict[str, Any]]
+    ) -> bytes:
+        """Serialize an update message, dropping the snapshot if it is too large"""
+        payload = {
+            "rule_type": rule_type,
+            "version": version,
+            "timestamp": timestamp,
+            "initiator": initiator,
+            "sender": self._instance_id
+        }
+        
+        if snapshot is not None:
+            # Rule dataclasses travel as plain field dicts; the receiving
+            # engine rebuilds them in apply_rules_snapshot
+            rules = {
+                name: asdict(rule) if is_dataclass(rule) else rule
+                for name, rule in snapshot["rules"].items()
+            }
+            try:
+                data = _pack({**payload, **snapshot, "rules": rules})
+            except TypeError as e:
+                logger.warning(f"Sending {rule_type} update without snapshot: {e}")
+            else:
+                if len(data) <= self.MAX_SNAPSHOT_BYTES:
+                    return data
+        
+        return _pack(payload)
+    
+    @contextmanager
+    def deferred_broadcasts(self, initiator: str = "system") -> Iterator[None]:
+        """
+        Collect update broadcasts made in this thread and send them together
+        
+        Updates queued with queue_update() inside the block are published
+        in a single pipeline when it exits.
+        
+        Args:
+            initiator: Who initiated the updates
+        """
+        if getattr(self._deferred, "items", None) is not None:
+            # Already deferring further up the stack
+            yield
+            return
+        
+        self._deferred.items = []
+        try:
+            yield
+        finally:
+            items, self._deferred.items = self._deferred.items, None
+            self.broadcast_updates_bulk(items, initiator)
+    
+    def queue_update(
+        self,
+        rule_type: str,
+        version: int,
+        initiator: str = "system",
+        snapshot: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Broadcast a rules update, batching it if broadcasts are deferred
+        
+        Args:
+            rule_type: Type of rules updated
+            version: New version number
+            initiator: Who initiated the update
+            snapshot: Optional {"base_version", "rules"} for in-place apply
+        """
+        items = getattr(self._deferred, "items", None)
+        if items is None:
+            self.broadcast_update(rule_type, version, initiator, snapshot)
+        else:
+            items.append((rule_type, version, snapshot))
+    
     def request_refresh(self, reason: str = "manual", initiator: str = "system"):
         """
         Request all workers to refresh their rules
@@ -237,14 +526,12 @@ class RulesSyncService:
         try:
             payload = {
                 "reason": reason,
-                "timestamp": datetime.utcnow().isoformat(),
-                "initiator": initiator
+                "timestamp": _now_iso(),
+                "initiator": initiator,
+                "sender": self._instance_id
             }
             
-            self.redis.publish(
-                self.CHANNELS["refresh"],
-                json.dumps(payload)
-            )
+            self._publish("refresh", _pack(payload))
             
             logger.info(f"Requested rules refresh: {reason}")
             
@@ -264,14 +551,12 @@ class RulesSyncService:
             payload = {
                 "rule_type": rule_type,
                 "target_version": target_version,
-                "timestamp": datetime.utcnow().isoformat(),
-                "initiator": initiator
+                "timestamp": _now_iso(),
+                "initiator": initiator,
+                "sender": self._instance_id
             }
             
-            self.redis.publish(
-                self.CHANNELS["rollback"],
-                json.dumps(payload)
-            )
+            self._publish("rollback", _pack(payload))
             
             logger.info(f"Broadcasted rollback: {rule_type} to v{target_version}")
             
@@ -293,9 +578,12 @@ class RulesSyncService:
         """Get current sync service status"""
         return {
             "is_running": self.is_running,
-            "subscribed_channels": list(self.CHANNELS.values()),
+            "stream": self.STREAM_KEY,
+            "last_id": self.last_id.decode() if isinstance(self.last_id, bytes) else self.last_id,
             "has_rules_engine": self.rules_engine is not None,
-            "listener_alive": self.listener_thread.is_alive() if self.listener_thread else False
+            "listener_alive": self.listener_thread.is_alive() if self.listener_thread else False,
+            "dispatcher_alive": self.dispatch_thread.is_alive() if self.dispatch_thread else False,
+            "queued_messages": self._queue.qsize()
         }
 
 
@@ -311,44 +599,7 @@ def enhance_rules_engine_with_sync(rules_engine, redis_client: redis.Redis):
     # Create sync service
     sync_service = RulesSyncService(redis_client, rules_engine)
     
-    # Add refresh method to rules engine
-    def refresh_rules(rule_type: str = None):
-        """Refresh rules from database"""
-        if rule_type:
-            # Refresh specific rule type
-            if rule_type == "commission":
-                rules_engine._load_commission_rules(rules_engine.db_session_factory())
-            elif rule_type == "marketing":
-                rules_engine._load_marketing_strategies(rules_engine.db_session_factory())
-            elif rule_type == "feature_flags":
-                rules_engine._load_feature_flags(rules_engine.db_session_factory())
-        else:
-            # Refresh all rules
-            rules_engine._load_all_rules()
-    
-    # Monkey patch the refresh method
-    rules_engine.refresh_rules = refresh_rules
-    
-    # Override update_rules to broadcast changes
-    original_update_rules = rules_engine.update_rules
-    
-    def update_rules_with_sync(rule_type, rules_data, admin_user_id):
-        # Call original method
-        success = original_update_rules(rule_type, rules_data, admin_user_id)
-        
-        if success:
-            # Broadcast update to other workers
-            sync_service.broadcast_update(
-                rule_type.value,
-                rules_engine.get_rules_version(),
-                f"admin:{admin_user_id}"
-            )
-        
-        return success
-    
-    rules_engine.update_rules = update_rules_with_sync
-    
-    # Store sync service reference
+    # The engine's update_rules broadcasts through this service once set
     rules_engine._sync_service = sync_service
     
     # Start sync service
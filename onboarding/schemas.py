@@ -0,0 +1,33 @@
+"""
+Request body schemas for onboarding API routes
+
+Bodies are parsed and validated in a single pass by pydantic-core, so
+routes receive typed models instead of re-checking raw dict lookups.
+"""
+
+from pydantic import BaseModel, constr
+
+from .validators import EmailValidator
+
+
+class RegisterIn(BaseModel):
+    """Body for POST /auth/register"""
+    email: constr(strip_whitespace=True, to_lower=True, pattern=EmailValidator.EMAIL_PATTERN.pattern)
+    password: constr(min_length=8)
+
+
+class VerifyEmailIn(BaseModel):
+    """Body for POST /auth/verify-email"""
+    user_id: constr(min_length=1)
+    token: constr(min_length=1)
+
+
+class StripeConnectIn(BaseModel):
+    """Body for POST /stripe/connect/start and /stripe/connect/refresh"""
+    return_url: constr(min_length=1)
+    refresh_url: constr(min_length=1)
+
+
+class TimezoneIn(BaseModel):
+    """Body for timezone update routes"""
+    timezone: constr(strip_whitespace=True, min_length=1, max_length=50)
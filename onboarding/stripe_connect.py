@@ -11,21 +11,194 @@ References:
 """
 
 import os
+import io
+import random
+import hmac
+import json
+import time
+import uuid
+import hashlib
+import itertools
 import logging
-from typing import Dict, Optional, Tuple
+import threading
+from functools import wraps
+from typing import BinaryIO, Callable, Dict, List, Optional, Tuple
+import requests
 import stripe
+from requests.adapters import HTTPAdapter
 
 # Configure Stripe API
 stripe.api_key = os.getenv("STRIPE_SECRET_KEY")
 
+# One pooled keep-alive session for all Stripe calls in the process, so
+# repeated calls reuse the TLS connection instead of reconnecting
+STRIPE_HTTP_POOL_SIZE = 50
+
+_stripe_session = requests.Session()
+_stripe_session.mount(
+    "https://", HTTPAdapter(pool_connections=STRIPE_HTTP_POOL_SIZE, pool_maxsize=STRIPE_HTTP_POOL_SIZE)
+)
+stripe.default_http_client = stripe.RequestsClient(session=_stripe_session)
+
+# Read once at import; assert_configured() reports a missing value at startup
+_WEBHOOK_SECRET = os.getenv("STRIPE_WEBHOOK_SECRET")
+
 logger = logging.getLogger(__name__)
 
+# Webhook bodies are hashed as they are read rather than after buffering
+WEBHOOK_READ_CHUNK_SIZE = 16 * 1024
+
+# Account status is polled by the frontend and re-read within a single
+# request; a short TTL collapses those into one Account.retrieve. The cache
+# is per process: force_refresh (account.updated in the Celery worker, the
+# Stripe return request) only refreshes the calling process, so other web
+# processes can serve a status up to the TTL old
+ACCOUNT_STATUS_TTL = 5  # seconds
+ACCOUNT_STATUS_CACHE_SIZE = 10000
+
+_account_status_cache: Dict[str, Tuple[float, Dict]] = {}
+_account_status_lock = threading.Lock()
+
+
+def _copy_status(status: Dict) -> Dict:
+    """Copy of a cached account status that callers may mutate freely"""
+    return {
+        **status,
+        "requirements": {
+            key: list(value) if isinstance(value, list) else value
+            for key, value in status["requirements"].items()
+        },
+        "capabilities": dict(status["capabilities"])
+    }
+
+
+# Client-side pacing, per process; size so processes x rate stays below
+# Stripe's live-mode limit (~100 req/s) and 429s are not provoked
+STRIPE_REQUESTS_PER_SECOND = float(os.getenv("STRIPE_REQUESTS_PER_SECOND", "25"))
+
+
+class _TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is free"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_stripe_limiter = _TokenBucket(STRIPE_REQUESTS_PER_SECOND)
+
+# Retry policy for transient Stripe failures (exponential backoff + jitter)
+STRIPE_MAX_ATTEMPTS = 5
+STRIPE_BACKOFF_BASE = 0.5  # seconds
+STRIPE_BACKOFF_CAP = 16  # seconds
+STRIPE_BACKOFF_JITTER = 0.5  # seconds
+
+
+def with_stripe_retry(
+    func: Optional[Callable] = None,
+    *,
+    max_attempts: int = STRIPE_MAX_ATTEMPTS,
+    retry_connection_errors: bool = True
+):
+    """
+    Retry a Stripe call on rate limiting and transient connection failures
+    
+    Every attempt first takes a token from the process-wide limiter.
+    
+    Sleeps min(cap, base * 2**attempt) plus jitter between attempts, or the
+    Retry-After header when Stripe sends one, and re-raises once
+    max_attempts is reached.
+    
+    Args:
+        func: Stripe SDK callable to wrap
+        max_attempts: Total attempts including the first
+        retry_connection_errors: Also retry APIConnectionError; only safe for
+            reads or writes that carry an idempotency key
+    """
+    retryable = (stripe.RateLimitError, stripe.APIConnectionError) if retry_connection_errors \
+        else (stripe.RateLimitError,)
+    
+    def decorator(f: Callable) -> Callable:
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            for attempt in range(max_attempts):
+                _stripe_limiter.acquire()
+                try:
+                    return f(*args, **kwargs)
+                except retryable as e:
+                    if attempt == max_attempts - 1:
+                        raise
+                    
+                    retry_after = (e.headers or {}).get("Retry-After")
+                    if retry_after and retry_after.isdigit():
+                        delay = float(retry_after)
+                    else:
+                        delay = min(STRIPE_BACKOFF_CAP, STRIPE_BACKOFF_BASE * 2 ** attempt) + \
+                            random.uniform(0, STRIPE_BACKOFF_JITTER)
+                    
+                    logger.warning(f"Stripe call {f.__name__} failed ({type(e).__name__}), "
+                                   f"retrying in {delay:.2f}s")
+                    time.sleep(delay)
+        return wrapper
+    
+    return decorator(func) if func is not None else decorator
+
 
 class StripeConnectError(Exception):
     """Raised when Stripe Connect operations fail"""
     pass
 
 
+def _progress_for(enabled: bool, details_submitted: bool, nothing_due: bool) -> Tuple[int, str]:
+    """Progress percentage and message for one combination of account flags"""
+    if enabled:
+        return 100, "Onboarding complete - ready to accept payments"
+    if details_submitted:
+        return 75, "Details submitted - verification in progress"
+    if nothing_due:
+        return 50, "Initial setup complete"
+    return 25, "Additional information required"
+
+
+# Onboarding progress keyed on (charges and payouts enabled, details
+# submitted, nothing currently due); every combination is precomputed
+_ONBOARDING_PROGRESS: Dict[Tuple[bool, bool, bool], Tuple[int, str]] = {
+    flags: _progress_for(*flags) for flags in itertools.product((False, True), repeat=3)
+}
+
+
+def assert_configured():
+    """
+    Fail fast if Stripe credentials are missing from the environment
+    
+    Raises:
+        StripeConnectError: If STRIPE_SECRET_KEY or STRIPE_WEBHOOK_SECRET is unset
+    """
+    missing = [
+        name for name, value in (
+            ("STRIPE_SECRET_KEY", stripe.api_key),
+            ("STRIPE_WEBHOOK_SECRET", _WEBHOOK_SECRET)
+        ) if not value
+    ]
+    if missing:
+        raise StripeConnectError(f"Stripe not configured: {', '.join(missing)} unset")
+
+
 class StripeConnectService:
     """
     Service for managing Stripe Connect Express accounts
@@ -35,13 +208,23 @@ class StripeConnectService:
     """
     
     @staticmethod
-    def create_express_account(user_email: str, country: str = "FR") -> str:
+    def create_express_account(
+        user_email: str,
+        country: str = "FR",
+        idempotency_key: Optional[str] = None
+    ) -> str:
         """
         Create a new Stripe Express account for creator
         
+        The idempotency key defaults to one derived from the email and
+        country, so retries and repeated calls within Stripe's 24h key
+        window return the same account. Pass a fresh key to deliberately
+        create another account for the same email.
+        
         Args:
             user_email: Creator's email address
             country: Country code (default: FR for France)
+            idempotency_key: Override for the derived idempotency key
             
         Returns:
             Stripe account ID
@@ -50,7 +233,12 @@ class StripeConnectService:
             StripeConnectError: If account creation fails
         """
         try:
-            account = stripe.Account.create(
+            if idempotency_key is None:
+                digest = hashlib.sha256(f"{user_email}:{country}".encode("utf-8")).hexdigest()[:32]
+                idempotency_key = f"acct:{digest}"
+            
+            account = with_stripe_retry(stripe.Account.create)(
+                idempotency_key=idempotency_key,
                 type="express",
                 email=user_email,
                 country=country,
@@ -60,7 +248,7 @@ class StripeConnectService:
                 }
             )
             
-            logger.info(f"Created Stripe Express account {account.id} for {user_email}")
+            logger.info("Created Stripe Express account %s for %s", account.id, user_email)
             return account.id
             
         except stripe.StripeError as e:
@@ -88,7 +276,10 @@ class StripeConnectService:
             StripeConnectError: If link creation fails
         """
         try:
-            account_link = stripe.AccountLink.create(
+            # One key per call: retries of this request dedupe, while a later
+            # refresh still gets a new link (links are single-use)
+            account_link = with_stripe_retry(stripe.AccountLink.create)(
+                idempotency_key=f"acctlink:{account_id}:{uuid.uuid4().hex}",
                 account=account_id,
                 refresh_url=refresh_url,
                 return_url=return_url,
@@ -96,7 +287,7 @@ class StripeConnectService:
                 collect="eventually_due"  # Collect all required information
             )
             
-            logger.info(f"Created onboarding link for account {account_id}")
+            logger.info("Created onboarding link for account %s", account_id)
             return account_link.url
             
         except stripe.StripeError as e:
@@ -121,7 +312,10 @@ class StripeConnectService:
             Account Link URL for account updates
         """
         try:
-            account_link = stripe.AccountLink.create(
+            # One key per call: retries of this request dedupe, while a later
+            # refresh still gets a new link (links are single-use)
+            account_link = with_stripe_retry(stripe.AccountLink.create)(
+                idempotency_key=f"acctlink:{account_id}:{uuid.uuid4().hex}",
                 account=account_id,
                 refresh_url=refresh_url,
                 return_url=return_url,
@@ -151,9 +345,9 @@ class StripeConnectService:
             StripeConnectError: If login link creation fails
         """
         try:
-            login_link = stripe.Account.create_login_link(account_id)
+            login_link = with_stripe_retry(stripe.Account.create_login_link)(account_id)
             
-            logger.info(f"Created dashboard login link for account {account_id}")
+            logger.info("Created dashboard login link for account %s", account_id)
             return login_link.url
             
         except stripe.StripeError as e:
@@ -161,12 +355,13 @@ class StripeConnectService:
             raise StripeConnectError(f"Dashboard login link creation failed: {str(e)}")
     
     @staticmethod
-    def get_account_status(account_id: str) -> Dict:
+    def get_account_status(account_id: str, force_refresh: bool = False) -> Dict:
         """
         Get comprehensive account status and requirements
         
         Args:
             account_id: Stripe Express account ID
+            force_refresh: Skip the cached copy and re-read from Stripe
             
         Returns:
             Dict containing account status information:
@@ -179,8 +374,15 @@ class StripeConnectService:
         Raises:
             StripeConnectError: If status retrieval fails
         """
+        now = time.monotonic()
+        with _account_status_lock:
+            cached = _account_status_cache.get(account_id)
+        if cached and cached[0] > now and not force_refresh:
+            return _copy_status(cached[1])
+        
         try:
-            account = stripe.Account.retrieve(account_id)
+            account = with_stripe_retry(stripe.Account.retrieve)(account_id)
+            requirements = account.requirements
             
             # Extract key status information
             status = {
@@ -188,74 +390,94 @@ class StripeConnectService:
                 "payouts_enabled": account.payouts_enabled,
                 "details_submitted": account.details_submitted,
                 "requirements": {
-                    "currently_due": account.requirements.currently_due or [],
-                    "eventually_due": account.requirements.eventually_due or [],
-                    "past_due": account.requirements.past_due or [],
-                    "pending_verification": account.requirements.pending_verification or [],
-                    "disabled_reason": account.requirements.disabled_reason
+                    "currently_due": requirements.currently_due or [],
+                    "eventually_due": requirements.eventually_due or [],
+                    "past_due": requirements.past_due or [],
+                    "pending_verification": requirements.pending_verification or [],
+                    "disabled_reason": requirements.disabled_reason
                 },
-                "capabilities": {}
+                # Stripe returns capabilities as {name: "active" | "inactive" | "pending"}
+                "capabilities": dict(account.get("capabilities") or {})
             }
             
-            # Extract capability status
-            if hasattr(account, 'capabilities'):
-                for capability, details in account.capabilities.items():
-                    status["capabilities"][capability] = details.status
+            with _account_status_lock:
+                if len(_account_status_cache) >= ACCOUNT_STATUS_CACHE_SIZE:
+                    _account_status_cache.pop(next(iter(_account_status_cache)))
+                _account_status_cache[account_id] = (now + ACCOUNT_STATUS_TTL, status)
             
-            return status
+            return _copy_status(status)
             
         except stripe.StripeError as e:
             logger.error(f"Failed to get account status for {account_id}: {str(e)}")
             raise StripeConnectError(f"Account status retrieval failed: {str(e)}")
     
     @staticmethod
-    def is_onboarding_complete(account_id: str) -> bool:
+    def is_onboarding_complete(account_id: str, status: Optional[Dict] = None) -> bool:
         """
         Check if Express account onboarding is complete
         
         Args:
             account_id: Stripe Express account ID
+            status: Already-fetched get_account_status result, if any
             
         Returns:
             True if onboarding is complete and account can process payments
         """
         try:
-            status = StripeConnectService.get_account_status(account_id)
-            return (
-                status["charges_enabled"] and
-                status["payouts_enabled"] and
-                status["details_submitted"]
-            )
+            if status is None:
+                status = StripeConnectService.get_account_status(account_id)
+            return StripeConnectService.compute_status(status)[0]
         except StripeConnectError:
             return False
     
     @staticmethod
-    def get_onboarding_progress(account_id: str) -> Tuple[int, str]:
+    def get_onboarding_progress(account_id: str, status: Optional[Dict] = None) -> Tuple[int, str]:
         """
         Get onboarding progress percentage and status message
         
         Args:
             account_id: Stripe Express account ID
+            status: Already-fetched get_account_status result, if any
             
         Returns:
             Tuple of (progress_percentage, status_message)
         """
         try:
-            status = StripeConnectService.get_account_status(account_id)
-            
-            # Calculate progress based on completion status
-            if status["charges_enabled"] and status["payouts_enabled"]:
-                return 100, "Onboarding complete - ready to accept payments"
-            elif status["details_submitted"]:
-                return 75, "Details submitted - verification in progress"
-            elif len(status["requirements"]["currently_due"]) == 0:
-                return 50, "Initial setup complete"
-            else:
-                return 25, "Additional information required"
+            if status is None:
+                status = StripeConnectService.get_account_status(account_id)
+            _, progress, message, _ = StripeConnectService.compute_status(status)
+            return progress, message
                 
         except StripeConnectError:
             return 0, "Unable to determine progress"
     
+    @staticmethod
+    def compute_status(status: Dict) -> Tuple[bool, int, str, Dict]:
+        """
+        Derive onboarding state from an already-fetched account status
+        
+        Args:
+            status: Dict returned by get_account_status
+            
+        Returns:
+            Tuple of (complete, progress_percentage, status_message, requirements)
+        """
+        complete = bool(
+            status["charges_enabled"] and
+            status["payouts_enabled"] and
+            status["details_submitted"]
+        )
+        
+        # Calculate progress based on completion status
+        requirements = status.get("requirements", {})
+        progress, message = _ONBOARDING_PROGRESS[(
+            bool(status["charges_enabled"] and status["payouts_enabled"]),
+            bool(status["details_submitted"]),
+            not requirements.get("currently_due", [])
+        )]
+        
+        return complete, progress, message, requirements
+    
     @staticmethod
     def handle_webhook_account_updated(account_id: str, db_session) -> bool:
         """
@@ -271,8 +493,8 @@ class StripeConnectService:
         try:
             from .models import CreatorProfile
             
-            # Get current account status
-            status = StripeConnectService.get_account_status(account_id)
+            # Get current account status; the event means any cached copy is stale
+            status = StripeConnectService.get_account_status(account_id, force_refresh=True)
             
             # Update creator profile with current status
             profile = db_session.query(CreatorProfile).filter_by(
@@ -282,10 +504,12 @@ class StripeConnectService:
             if profile:
                 profile.stripe_charges_enabled = status["charges_enabled"]
                 profile.stripe_payouts_enabled = status["payouts_enabled"]
-                profile.stripe_onboarding_completed = StripeConnectService.is_onboarding_complete(account_id)
+                profile.stripe_onboarding_completed = StripeConnectService.is_onboarding_complete(
+                    account_id, status
+                )
                 db_session.commit()
                 
-                logger.info(f"Updated creator profile for Stripe account {account_id}")
+                logger.info("Updated creator profile for Stripe account %s", account_id)
                 return True
             
             return False
@@ -311,17 +535,114 @@ class WebhookHandler:
         Returns:
             True if signature is valid
         """
-        webhook_secret = os.getenv("STRIPE_WEBHOOK_SECRET")
-        if not webhook_secret:
-            logger.error("STRIPE_WEBHOOK_SECRET not configured")
-            return False
-        
         try:
-            stripe.Webhook.construct_event(payload, signature, webhook_secret)
+            WebhookHandler.construct_webhook_event(payload, signature)
             return True
+        except StripeConnectError:
+            return False
         except (stripe.SignatureVerificationError, ValueError) as e:
             logger.error(f"Webhook signature verification failed: {str(e)}")
             return False
+
+    @staticmethod
+    def construct_webhook_event(payload: bytes, signature: str) -> stripe.Event:
+        """
+        Verify webhook signature and parse the event in a single pass
+
+        Stripe checks the HMAC with a constant-time comparison before the
+        payload is decoded, so invalid signatures are rejected cheaply.
+
+        Args:
+            payload: Raw webhook payload
+            signature: Stripe-Signature header value
+
+        Returns:
+            Parsed Stripe event
+
+        Raises:
+            StripeConnectError: If STRIPE_WEBHOOK_SECRET is not configured
+            stripe.SignatureVerificationError: If signature is invalid
+            ValueError: If payload is not valid JSON
+        """
+        if not _WEBHOOK_SECRET:
+            logger.error("STRIPE_WEBHOOK_SECRET not configured")
+            raise StripeConnectError("Webhook secret not configured")
+
+        return stripe.Webhook.construct_event(payload, signature, _WEBHOOK_SECRET)
+    
+    @staticmethod
+    def construct_webhook_event_from_stream(stream: BinaryIO, signature: str) -> stripe.Event:
+        """
+        Verify webhook signature while reading the body, then parse the event
+        
+        Each chunk feeds the HMAC as it is read, and the body is only
+        decoded after the v1 signature and timestamp check out, so forged
+        payloads are never parsed. The whole body is still buffered for the
+        JSON parse; its size is bounded by MAX_CONTENT_LENGTH, not by this
+        function.
+        
+        Args:
+            stream: Request body stream (bounded by Content-Length)
+            signature: Stripe-Signature header value
+            
+        Returns:
+            Parsed Stripe event
+            
+        Raises:
+            StripeConnectError: If STRIPE_WEBHOOK_SECRET is not configured
+            stripe.SignatureVerificationError: If signature is invalid
+            ValueError: If payload is not valid JSON
+        """
+        if not _WEBHOOK_SECRET:
+            logger.error("STRIPE_WEBHOOK_SECRET not configured")
+            raise StripeConnectError("Webhook secret not configured")
+        
+        timestamp, signatures = WebhookHandler._parse_signature_header(signature)
+        
+        mac = hmac.new(_WEBHOOK_SECRET.encode("utf-8"), f"{timestamp}.".encode("utf-8"), hashlib.sha256)
+        buffer = io.BytesIO()
+        while True:
+            chunk = stream.read(WEBHOOK_READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            mac.update(chunk)
+            buffer.write(chunk)
+        
+        expected = mac.hexdigest()
+        if not any(hmac.compare_digest(expected, candidate) for candidate in signatures):
+            raise stripe.SignatureVerificationError(
+                "No signatures found matching the expected signature for payload", signature
+            )
+        
+        if timestamp < time.time() - stripe.Webhook.DEFAULT_TOLERANCE:
+            raise stripe.SignatureVerificationError(
+                f"Timestamp outside the tolerance zone ({timestamp})", signature
+            )
+        
+        return stripe.Event.construct_from(json.loads(buffer.getvalue()), stripe.api_key)
+    
+    @staticmethod
+    def _parse_signature_header(signature: str) -> Tuple[int, List[str]]:
+        """Split Stripe-Signature into its timestamp and v1 signatures"""
+        timestamp = None
+        signatures = []
+        for item in signature.split(","):
+            key, _, value = item.strip().partition("=")
+            if key == "t":
+                timestamp = value
+            elif key == "v1":
+                signatures.append(value)
+        
+        if timestamp is None or not timestamp.isdigit():
+            raise stripe.SignatureVerificationError(
+                "Unable to extract timestamp and signatures from header", signature
+            )
+        if not signatures:
+            raise stripe.SignatureVerificationError(
+                "No signatures found with expected scheme v1", signature
+            )
+        
+        return int(timestamp), signatures
     
     @staticmethod
     def handle_webhook_event(event_type: str, event_data: dict, db_session) -> bool:
@@ -346,7 +667,7 @@ class WebhookHandler:
             # - person.created, person.updated
             # - account.external_account.created
             
-            logger.info(f"Unhandled webhook event type: {event_type}")
+            logger.info("Unhandled webhook event type: %s", event_type)
             return True
             
         except Exception as e:
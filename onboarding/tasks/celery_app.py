@@ -0,0 +1,53 @@
+"""
+Celery application for onboarding background tasks
+
+Shared by the web process (to enqueue work) and the workers. Broker
+settings come from the environment so each deployment can point at
+its own Redis/RabbitMQ instance.
+
+Run a worker with:
+    celery -A onboarding.tasks.celery_app worker -Q celery,email --loglevel=info
+
+Marketing automation tasks have their own queues so slow account scraping
+does not hold up pricing work; size each worker pool for its workload:
+    celery -A onboarding.tasks.celery_app worker -Q scrape -c 2
+    celery -A onboarding.tasks.celery_app worker -Q compute -c 8
+    celery -A onboarding.tasks.celery_app worker -Q ml -c 4 --pool=prefork
+"""
+
+import os
+from celery import Celery
+from celery.schedules import crontab
+
+celery_app = Celery(
+    "onboarding",
+    broker=os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"),
+    include=[
+        "onboarding.tasks.webhooks",
+        "onboarding.tasks.email",
+        "onboarding.tasks.marketing_auto",
+        "onboarding.tasks.maintenance",
+        "onboarding.tasks.onboarding"
+    ]
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    timezone="UTC",
+    enable_utc=True,
+    task_ignore_result=True,
+    task_routes={
+        "onboarding.tasks.email.*": {"queue": "email"},
+        "onboarding.tasks.marketing_auto.schedule_account_size_analysis": {"queue": "scrape"},
+        "onboarding.tasks.marketing_auto.schedule_pricing_tier_calculation": {"queue": "compute"},
+        "onboarding.tasks.marketing_auto.schedule_content_category_detection": {"queue": "ml"},
+        "onboarding.tasks.marketing_auto.refresh_analytics_chunk": {"queue": "scrape"}
+    },
+    beat_schedule={
+        "purge-expired-verification-tokens": {
+            "task": "onboarding.tasks.maintenance.purge_expired_verification_tokens",
+            "schedule": crontab(minute=0)
+        }
+    }
+)
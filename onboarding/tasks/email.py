@@ -0,0 +1,72 @@
+"""
+Background delivery of onboarding emails
+
+Sending through SMTP/SendGrid/SES takes tens to hundreds of milliseconds,
+so the request path only records an outbound_emails row and enqueues its
+ID here. Tasks are routed to the dedicated "email" queue.
+"""
+
+import logging
+from datetime import datetime
+from sqlalchemy import select
+
+from .celery_app import celery_app
+from ..db_helper import get_db
+from ..emailer import EmailService, EmailError
+from ..models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    max_retries=5,
+    retry_backoff=True
+)
+def send_email_task(self, outbound_email_id: str) -> bool:
+    """
+    Deliver a queued outbound email
+
+    Args:
+        outbound_email_id: OutboundEmail primary key
+
+    Returns:
+        True once the provider accepted the message, False if the row was
+        already sent, is being sent by another worker, or the final retry
+        failed
+    """
+    with get_db() as db:
+        email = db.execute(
+            select(OutboundEmail)
+            .where(OutboundEmail.id == outbound_email_id, OutboundEmail.sent_at.is_(None))
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+
+        if email is None:
+            logger.info(f"Outbound email {outbound_email_id} already sent, skipping")
+            return False
+
+        try:
+            if email.kind == "verification":
+                sent = EmailService().send_verification_email(**email.payload)
+            else:
+                raise EmailError(f"Unknown outbound email kind: {email.kind}")
+
+            # EmailService reports failures by return value; raise so Celery retries
+            if not sent:
+                raise EmailError(f"Delivery failed for outbound email {outbound_email_id}")
+        except Exception:
+            if self.request.retries < self.max_retries:
+                raise
+
+            # Out of retries: don't keep the raw token around; the row
+            # itself is purged with the expired verification tokens
+            email.payload = None
+            logger.exception(f"Giving up on outbound email {outbound_email_id}, payload cleared")
+            return False
+
+        email.sent_at = datetime.utcnow()
+        email.payload = None
+
+    return True
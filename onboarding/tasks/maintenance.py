@@ -0,0 +1,42 @@
+"""
+Periodic housekeeping tasks
+
+Scheduled through Celery beat (see celery_app.py). Run beat with:
+    celery -A onboarding.tasks.celery_app beat --loglevel=info
+"""
+
+import logging
+from datetime import datetime, timedelta
+
+from .celery_app import celery_app
+from ..db_helper import get_db
+from ..models import OutboundEmail
+from ..tokens import EmailTokenService, TOKEN_TTL_MINUTES
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task
+def purge_expired_verification_tokens() -> int:
+    """
+    Delete verification tokens past the cleanup threshold
+
+    Keeps the verification_tokens table and its user_id index small so
+    token lookups in verify_email stay cheap. Verification emails still
+    unsent after the token TTL are deleted too, since their payload holds
+    the raw token and the link in it no longer works.
+
+    Returns:
+        Number of tokens deleted
+    """
+    with get_db() as db:
+        count = EmailTokenService.cleanup_expired_tokens(db)
+
+        unsent = db.query(OutboundEmail).filter(
+            OutboundEmail.kind == "verification",
+            OutboundEmail.sent_at.is_(None),
+            OutboundEmail.created_at < datetime.utcnow() - timedelta(minutes=TOKEN_TTL_MINUTES)
+        ).delete(synchronize_session=False)
+
+    logger.info(f"Cleaned up {count} expired verification tokens and {unsent} unsent verification emails")
+    return count
@@ -10,16 +10,50 @@ These tasks run asynchronously after Stripe onboarding completion to:
 3. Detect content categories for targeted marketing
 4. Set up automated content scheduling preferences
 
-Requires task queue integration (Celery, RQ, or similar).
+Tasks are registered on the shared onboarding Celery app.
 """
 
+import heapq
 import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from operator import itemgetter
 from typing import Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
 
+from .celery_app import celery_app
+from ..db_helper import get_db
+
 logger = logging.getLogger(__name__)
 
+# Analyzer fetches are I/O-bound and independent, so they overlap on a
+# small shared pool instead of running back to back
+analysis_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="onlyfans-analysis")
+
+# Pricing tiers, best first: (tier, minimum metric values, suggested price range)
+PRICING_TIERS = (
+    ("premium", {"avg_monthly_revenue": 10000, "subscriber_ltv": 100, "conversion_rate": 0.05}, (30, 50)),
+    ("mid", {"avg_monthly_revenue": 2000, "subscriber_ltv": 40, "followers": 50000}, (15, 30)),
+)
+DEFAULT_PRICING_TIER = ("entry", (5, 15))
+
+# Account sizes, largest first: (size, minimum followers, minimum engagement rate)
+ACCOUNT_SIZES = (
+    ("large", 500000, 0.05),
+    ("medium", 100000, 0.03),
+    ("small", 10000, 0.02),
+)
+DEFAULT_ACCOUNT_SIZE = "micro"
+
+CONTENT_CATEGORIES = ("lifestyle", "fitness", "gaming", "art", "music", "comedy", "fashion", "adult")
+CATEGORY_CONFIDENCE_THRESHOLD = 0.3
+CATEGORY_LIMIT = 3
+
+# Periodic refresh: profiles per run, and profiles written per bulk update
+ANALYTICS_REFRESH_LIMIT = 5000
+ANALYTICS_REFRESH_CHUNK_SIZE = 500
+
 
 class MarketingAnalysisError(Exception):
     """Raised when marketing analysis tasks fail"""
@@ -35,12 +69,13 @@ class OnlyFansAnalyzer:
     """
     
     @staticmethod
-    def analyze_account_size(handle: str) -> Tuple[str, Dict]:
+    def analyze_account_size(handle: str, metrics: Optional[Dict] = None) -> Tuple[str, Dict]:
         """
         Analyze OnlyFans account to determine size category
         
         Args:
             handle: OnlyFans username/handle
+            metrics: Account metrics already fetched in a batch, if any
             
         Returns:
             Tuple of (size_category, metrics_dict)
@@ -53,29 +88,32 @@ class OnlyFansAnalyzer:
         """
         try:
             # Simulate API call or scraping (implement with actual service)
-            metrics = OnlyFansAnalyzer._fetch_account_metrics(handle)
+            if metrics is None:
+                metrics = OnlyFansAnalyzer._fetch_account_metrics(handle)
             
             followers = metrics.get("followers", 0)
             engagement_rate = metrics.get("engagement_rate", 0.0)
             posts_per_week = metrics.get("posts_per_week", 0)
             
-            # Categorize based on metrics
-            if followers >= 500000 and engagement_rate >= 0.05:
-                size = "large"
-            elif followers >= 100000 and engagement_rate >= 0.03:
-                size = "medium" 
-            elif followers >= 10000 and engagement_rate >= 0.02:
-                size = "small"
-            else:
-                size = "micro"
+            size = OnlyFansAnalyzer.classify_account_size(followers, engagement_rate)
             
-            logger.info(f"Analyzed account {handle}: {size} ({followers} followers, {engagement_rate:.2%} engagement)")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Analyzed account %s: %s (%s followers, %.2f%% engagement)",
+                            handle, size, followers, engagement_rate * 100)
             return size, metrics
             
         except Exception as e:
             logger.error(f"Account size analysis failed for {handle}: {str(e)}")
             return "small", {}  # Default fallback
     
+    @staticmethod
+    def classify_account_size(followers: int, engagement_rate: float) -> str:
+        """Map follower count and engagement rate to a size category"""
+        for size, min_followers, min_engagement in ACCOUNT_SIZES:
+            if followers >= min_followers and engagement_rate >= min_engagement:
+                return size
+        return DEFAULT_ACCOUNT_SIZE
+    
     @staticmethod
     def calculate_pricing_tier(handle: str, account_metrics: Dict) -> Tuple[str, Dict]:
         """
@@ -102,23 +140,19 @@ class OnlyFansAnalyzer:
             conversion_rate = revenue_metrics.get("conversion_rate", 0.0)
             
             # Combine with account metrics
-            followers = account_metrics.get("followers", 0)
-            engagement_rate = account_metrics.get("engagement_rate", 0.0)
+            values = {
+                "avg_monthly_revenue": avg_monthly_revenue,
+                "subscriber_ltv": subscriber_ltv,
+                "conversion_rate": conversion_rate,
+                "followers": account_metrics.get("followers", 0)
+            }
             
-            # Calculate pricing tier
-            if (avg_monthly_revenue >= 10000 and 
-                subscriber_ltv >= 100 and 
-                conversion_rate >= 0.05):
-                tier = "premium"
-                suggested_price_range = (30, 50)
-            elif (avg_monthly_revenue >= 2000 and 
-                  subscriber_ltv >= 40 and 
-                  followers >= 50000):
-                tier = "mid"  
-                suggested_price_range = (15, 30)
-            else:
-                tier = "entry"
-                suggested_price_range = (5, 15)
+            # Calculate pricing tier: first tier whose minimums are all met
+            tier, suggested_price_range = DEFAULT_PRICING_TIER
+            for candidate, minimums, price_range in PRICING_TIERS:
+                if all(values[metric] >= minimum for metric, minimum in minimums.items()):
+                    tier, suggested_price_range = candidate, price_range
+                    break
             
             pricing_analysis = {
                 "tier": tier,
@@ -130,7 +164,7 @@ class OnlyFansAnalyzer:
                 "analysis_date": datetime.utcnow().isoformat()
             }
             
-            logger.info(f"Calculated pricing tier for {handle}: {tier} (${suggested_price_range[0]}-${suggested_price_range[1]})")
+            logger.info("Calculated pricing tier for %s: %s ($%s-$%s)", handle, tier, *suggested_price_range)
             return tier, pricing_analysis
             
         except Exception as e:
@@ -154,19 +188,19 @@ class OnlyFansAnalyzer:
             # Analyze recent posts/content (implement with content analysis service)
             content_analysis = OnlyFansAnalyzer._analyze_content_categories(handle)
             
-            detected_categories = []
-            confidence_threshold = 0.3
-            
-            for category, confidence in content_analysis.items():
-                if confidence >= confidence_threshold:
-                    detected_categories.append(category)
+            # Top 3 categories by confidence, dropping any below the threshold
+            top = heapq.nlargest(CATEGORY_LIMIT, content_analysis.items(), key=itemgetter(1))
+            detected_categories = [
+                category for category, confidence in top
+                if confidence >= CATEGORY_CONFIDENCE_THRESHOLD
+            ]
             
             # Ensure at least one category
             if not detected_categories:
                 detected_categories = ["lifestyle"]  # Default
                 
-            logger.info(f"Detected content categories for {handle}: {detected_categories}")
-            return detected_categories[:3]  # Limit to top 3 categories
+            logger.info("Detected content categories for %s: %s", handle, detected_categories)
+            return detected_categories
             
         except Exception as e:
             logger.error(f"Content category detection failed for {handle}: {str(e)}")
@@ -179,29 +213,39 @@ class OnlyFansAnalyzer:
         
         This is a placeholder - implement with actual data source
         """
-        # Simulate realistic data for development
-        import random
+        return OnlyFansAnalyzer._fetch_account_metrics_batch([handle])[0]
+    
+    @staticmethod
+    def _fetch_account_metrics_batch(handles: List[str]) -> List[Dict]:
+        """
+        Fetch account metrics for several handles in one pass
         
-        base_followers = random.randint(1000, 1000000)
-        engagement_rate = random.uniform(0.01, 0.08)
+        This is a placeholder - implement with the data source's bulk lookup
+        """
+        # Simulate realistic data for development
+        last_updated = datetime.utcnow().isoformat()
+        randint, uniform = random.randint, random.uniform
         
-        return {
-            "followers": base_followers,
-            "following": random.randint(100, 5000),
-            "posts_count": random.randint(50, 2000),
-            "engagement_rate": engagement_rate,
-            "posts_per_week": random.randint(3, 20),
-            "avg_likes_per_post": int(base_followers * engagement_rate * 0.8),
-            "avg_comments_per_post": int(base_followers * engagement_rate * 0.1),
-            "account_age_months": random.randint(6, 60),
-            "last_updated": datetime.utcnow().isoformat()
-        }
+        results = []
+        for _ in handles:
+            base_followers = randint(1000, 1000000)
+            engagement_rate = uniform(0.01, 0.08)
+            results.append({
+                "followers": base_followers,
+                "following": randint(100, 5000),
+                "posts_count": randint(50, 2000),
+                "engagement_rate": engagement_rate,
+                "posts_per_week": randint(3, 20),
+                "avg_likes_per_post": int(base_followers * engagement_rate * 0.8),
+                "avg_comments_per_post": int(base_followers * engagement_rate * 0.1),
+                "account_age_months": randint(6, 60),
+                "last_updated": last_updated
+            })
+        return results
     
     @staticmethod
     def _fetch_revenue_metrics(handle: str) -> Dict:
         """Fetch revenue/performance metrics (placeholder implementation)"""
-        import random
-        
         return {
             "avg_monthly_revenue": random.randint(100, 50000),
             "subscriber_count": random.randint(50, 10000),
@@ -215,16 +259,9 @@ class OnlyFansAnalyzer:
     @staticmethod
     def _analyze_content_categories(handle: str) -> Dict[str, float]:
         """Analyze content categories (placeholder implementation)"""
-        import random
-        
-        categories = ["lifestyle", "fitness", "gaming", "art", "music", "comedy", "fashion", "adult"]
-        
         # Simulate category confidence scores
-        analysis = {}
-        for category in categories:
-            analysis[category] = random.uniform(0.0, 1.0)
-        
-        return analysis
+        uniform = random.uniform
+        return {category: uniform(0.0, 1.0) for category in CONTENT_CATEGORIES}
 
 
 class MarketingAutomationService:
@@ -257,11 +294,9 @@ class MarketingAutomationService:
                     return False
                 
                 handle = profile.onlyfans_handle
-                
-                # Run comprehensive analysis
-                account_size, metrics = OnlyFansAnalyzer.analyze_account_size(handle)
-                pricing_tier, pricing_data = OnlyFansAnalyzer.calculate_pricing_tier(handle, metrics)
-                content_categories = OnlyFansAnalyzer.detect_content_categories(handle)
+                account_size, pricing_tier, content_categories, metrics, pricing_data = (
+                    self.analyze_handle(handle)
+                )
                 
                 # Update profile with analysis results
                 profile.account_size = account_size
@@ -285,6 +320,64 @@ class MarketingAutomationService:
             logger.error(f"Marketing automation failed for user {user_id}: {str(e)}")
             return False
     
+    @staticmethod
+    def analyze_handle(handle: str, metrics: Optional[Dict] = None) -> Tuple[str, str, List[str], Dict, Dict]:
+        """
+        Run the full analysis for one OnlyFans handle without touching the DB
+        
+        Content analysis overlaps with the size -> pricing chain (pricing
+        needs the account metrics). Pass ``metrics`` when they were already
+        fetched in a batch.
+        
+        Returns:
+            Tuple of (account_size, pricing_tier, content_categories,
+            account_metrics, pricing_analysis)
+        """
+        categories_future = analysis_executor.submit(
+            OnlyFansAnalyzer.detect_content_categories, handle
+        )
+        account_size, metrics = OnlyFansAnalyzer.analyze_account_size(handle, metrics)
+        pricing_tier, pricing_data = OnlyFansAnalyzer.calculate_pricing_tier(handle, metrics)
+        return account_size, pricing_tier, categories_future.result(), metrics, pricing_data
+    
+    def refresh_profiles(self, profiles: List[Tuple[str, str]]) -> int:
+        """
+        Re-analyze a chunk of profiles and write them back in one bulk update
+        
+        Args:
+            profiles: (profile_id, onlyfans_handle) pairs
+            
+        Returns:
+            Number of profiles updated
+        """
+        now = datetime.utcnow()
+        all_metrics = OnlyFansAnalyzer._fetch_account_metrics_batch([handle for _, handle in profiles])
+        mappings = []
+        for (profile_id, handle), metrics in zip(profiles, all_metrics):
+            try:
+                account_size, pricing_tier, content_categories, _, _ = self.analyze_handle(handle, metrics)
+            except Exception as e:
+                logger.error(f"Analytics refresh failed for profile {profile_id}: {str(e)}")
+                continue
+            mappings.append({
+                "id": profile_id,
+                "account_size": account_size,
+                "pricing_tier": pricing_tier,
+                "content_categories": content_categories,
+                # Bulk updates skip column onupdate hooks; set it so the
+                # refreshed rows leave the stale window
+                "updated_at": now
+            })
+        
+        if mappings:
+            with self.db_session_factory() as db:
+                from ..models import CreatorProfile
+                
+                db.bulk_update_mappings(CreatorProfile, mappings)
+                db.commit()
+        
+        return len(mappings)
+    
     def update_creator_analytics(self, user_id: str) -> bool:
         """
         Update analytics for existing creator (periodic refresh)
@@ -304,25 +397,19 @@ class MarketingAutomationService:
             return False
 
 
-# Task Queue Integration (Celery example)
-# Uncomment and modify for your task queue system
-
-"""
-from celery import Celery
-
-# Initialize Celery app (configure with your broker)
-celery_app = Celery('marketing_automation')
+# Task Queue Integration
+# Tasks run on the shared onboarding Celery app; see celery_app.py
 
 @celery_app.task(bind=True, max_retries=3)
 def schedule_account_size_analysis(self, user_id: str):
-    '''
+    """
     Celery task for account size analysis
     
     Args:
         user_id: User ID to analyze
-    '''
+    """
     try:
-        service = MarketingAutomationService(get_db_session_factory())
+        service = MarketingAutomationService(get_db)
         success = service.process_new_creator(user_id)
         
         if not success:
@@ -336,11 +423,12 @@ def schedule_account_size_analysis(self, user_id: str):
         # Retry with exponential backoff
         raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
-@celery_app.task(bind=True, max_retries=3) 
+
+@celery_app.task(bind=True, max_retries=3)
 def schedule_pricing_tier_calculation(self, user_id: str):
-    '''Celery task for pricing tier calculation'''
+    """Celery task for pricing tier calculation"""
     try:
-        service = MarketingAutomationService(get_db_session_factory())
+        service = MarketingAutomationService(get_db)
         success = service.process_new_creator(user_id)
         
         if not success:
@@ -352,11 +440,12 @@ def schedule_pricing_tier_calculation(self, user_id: str):
         logger.error(f"Pricing calculation task failed for user {user_id}: {str(e)}")
         raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
+
 @celery_app.task(bind=True, max_retries=3)
 def schedule_content_category_detection(self, user_id: str):
-    '''Celery task for content category detection'''
+    """Celery task for content category detection"""
     try:
-        service = MarketingAutomationService(get_db_session_factory()) 
+        service = MarketingAutomationService(get_db)
         success = service.process_new_creator(user_id)
         
         if not success:
@@ -368,43 +457,51 @@ def schedule_content_category_detection(self, user_id: str):
         logger.error(f"Content analysis task failed for user {user_id}: {str(e)}")
         raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
 
+
+@celery_app.task(bind=True, max_retries=3)
+def refresh_analytics_chunk(self, profiles: List[Tuple[str, str]]):
+    """
+    Celery task refreshing one chunk of creator profiles
+    
+    Args:
+        profiles: (profile_id, onlyfans_handle) pairs
+    """
+    try:
+        service = MarketingAutomationService(get_db)
+        updated = service.refresh_profiles(profiles)
+        logger.info(f"Refreshed analytics for {updated}/{len(profiles)} creators")
+        
+    except Exception as e:
+        logger.error(f"Analytics refresh chunk failed: {str(e)}")
+        raise self.retry(exc=e, countdown=60 * (2 ** self.request.retries))
+
+
 @celery_app.task
 def periodic_analytics_refresh():
-    '''
+    """
     Periodic task to refresh analytics for all active creators
     Schedule to run weekly/monthly
-    '''
+    
+    Stale profiles are split into chunks; each chunk is analyzed by one
+    task and written back with a single bulk update.
+    """
     try:
-        with get_db_session_factory()() as db:
+        with get_db() as db:
             from ..models import CreatorProfile
             
             # Get active creators who need analytics refresh
             cutoff_date = datetime.utcnow() - timedelta(days=30)
-            profiles = db.query(CreatorProfile).filter(
+            profiles = db.query(CreatorProfile.id, CreatorProfile.onlyfans_handle).filter(
                 CreatorProfile.onboarding_completed == True,
+                CreatorProfile.onlyfans_handle.isnot(None),
                 CreatorProfile.updated_at < cutoff_date
-            ).limit(100).all()  # Process in batches
-            
-            for profile in profiles:
-                # Schedule individual refresh tasks
-                schedule_account_size_analysis.delay(profile.user_id)
+            ).limit(ANALYTICS_REFRESH_LIMIT).all()
+        
+        for start in range(0, len(profiles), ANALYTICS_REFRESH_CHUNK_SIZE):
+            chunk = profiles[start:start + ANALYTICS_REFRESH_CHUNK_SIZE]
+            refresh_analytics_chunk.delay([(row.id, row.onlyfans_handle) for row in chunk])
                 
         logger.info(f"Scheduled analytics refresh for {len(profiles)} creators")
         
     except Exception as e:
         logger.error(f"Periodic analytics refresh failed: {str(e)}")
-"""
-
-
-# Placeholder task functions for non-Celery environments
-def schedule_account_size_analysis(user_id: str):
-    """Placeholder - implement with your task queue"""
-    logger.info(f"Would schedule account size analysis for user {user_id}")
-
-def schedule_pricing_tier_calculation(user_id: str): 
-    """Placeholder - implement with your task queue"""
-    logger.info(f"Would schedule pricing tier calculation for user {user_id}")
-
-def schedule_content_category_detection(user_id: str):
-    """Placeholder - implement with your task queue"""  
-    logger.info(f"Would schedule content category detection for user {user_id}")
\ No newline at end of file
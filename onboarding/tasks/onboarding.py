@@ -0,0 +1,39 @@
+"""
+Deferred onboarding completion
+
+handle_stripe_return records the Stripe status and returns; activation,
+initial business rules and marketing scheduling run here.
+"""
+
+import logging
+
+from .celery_app import celery_app
+from ..db_helper import get_db
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    bind=True,
+    autoretry_for=(Exception,),
+    max_retries=5,
+    retry_backoff=True
+)
+def complete_onboarding_task(self, user_id: str) -> bool:
+    """
+    Complete onboarding for a user whose Stripe account is ready
+
+    Args:
+        user_id: User ID
+
+    Returns:
+        True if this run completed onboarding, False if already completed
+
+    Another worker holding the session raises OnboardingBusyError, and the
+    retry then finds the session completed or free to claim.
+    """
+    # Import here to avoid circular dependencies (service enqueues this task)
+    from ..service import OnboardingService
+
+    with get_db() as db:
+        return OnboardingService().finalize_onboarding(db, user_id)
@@ -0,0 +1,170 @@
+"""
+Background processing for Stripe webhooks
+
+The webhook route only verifies the signature and enqueues the event so
+Stripe gets its acknowledgement immediately. Business logic (DB writes,
+Stripe re-queries) runs here, guarded by the processed_stripe_events
+table so redelivered events are applied at most once.
+
+account.updated events for the same account often arrive in bursts;
+they are coalesced into a single delayed sync per account.
+"""
+
+import os
+import logging
+from typing import Optional
+
+import redis
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .celery_app import celery_app
+from ..db_helper import get_db
+from ..models import ProcessedStripeEvent
+from ..stripe_connect import StripeConnectService, WebhookHandler, StripeConnectError
+
+logger = logging.getLogger(__name__)
+
+# Events for one account within this window share a single sync
+ACCOUNT_SYNC_DELAY = 0.5  # seconds
+ACCOUNT_SYNC_KEY = "stripe:account_sync:{account_id}"
+ACCOUNT_SYNC_KEY_TTL = 60  # seconds; guards against a lost sync task
+
+_redis: Optional[redis.Redis] = None
+
+
+def _get_redis() -> redis.Redis:
+    """Redis client on the broker instance, which every worker can reach"""
+    global _redis
+    if _redis is None:
+        _redis = redis.Redis.from_url(os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0"))
+    return _redis
+
+
+def schedule_account_sync(account_id: str) -> bool:
+    """
+    Schedule a status sync for an account unless one is already pending
+
+    Args:
+        account_id: Stripe Express account ID
+
+    Returns:
+        True if a new sync was scheduled
+    """
+    key = ACCOUNT_SYNC_KEY.format(account_id=account_id)
+    # The marker counts events, so the sync can tell whether more arrived
+    # while it was running
+    count, _ = _get_redis().pipeline().incr(key).expire(key, ACCOUNT_SYNC_KEY_TTL, nx=True).execute()
+    if count != 1:
+        return False
+
+    sync_account_status.apply_async((account_id,), countdown=ACCOUNT_SYNC_DELAY)
+    return True
+
+
+def _claim_event(db: Session, event_id: str, event_type: str) -> bool:
+    """
+    Record an event as processed
+
+    Returns:
+        False if the event was already recorded
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return bool(db.execute(
+            insert(ProcessedStripeEvent)
+            .values(event_id=event_id, event_type=event_type)
+            .on_conflict_do_nothing(index_elements=["event_id"])
+        ).rowcount)
+
+    # Other databases (local development): let the primary key reject a duplicate
+    try:
+        with db.begin_nested():
+            db.add(ProcessedStripeEvent(event_id=event_id, event_type=event_type))
+    except IntegrityError:
+        return False
+    return True
+
+
+@celery_app.task(
+    bind=True,
+    acks_late=True,
+    autoretry_for=(Exception,),
+    max_retries=5,
+    retry_backoff=True
+)
+def process_stripe_event(self, event_id: str, event_type: str, event_data: dict) -> bool:
+    """
+    Apply a verified Stripe webhook event
+
+    Args:
+        event_id: Stripe event ID (idempotency key)
+        event_type: Stripe event type
+        event_data: Event data payload as a plain dict
+
+    Returns:
+        True if the event was applied or had already been processed
+    """
+    with get_db() as db:
+        # Claim the event; a redelivery finds the row and skips
+        if not _claim_event(db, event_id, event_type):
+            logger.info(f"Stripe event {event_id} already processed, skipping")
+            return True
+
+        if event_type == "account.updated":
+            # Status is re-read from Stripe, so a burst needs only one sync
+            if not schedule_account_sync(event_data["object"]["id"]):
+                logger.info(f"Stripe event {event_id} coalesced into pending account sync")
+            return True
+
+        # Failure rolls back the claim so the retry can process it again
+        if not WebhookHandler.handle_webhook_event(event_type, event_data, db):
+            raise StripeConnectError(f"Processing failed for Stripe event {event_id}")
+
+    logger.info(f"Processed Stripe event {event_id} ({event_type})")
+    return True
+
+
+@celery_app.task(
+    bind=True,
+    acks_late=True,
+    autoretry_for=(Exception,),
+    max_retries=5,
+    retry_backoff=True
+)
+def sync_account_status(self, account_id: str) -> bool:
+    """
+    Sync a creator profile with its current Stripe account status
+
+    Args:
+        account_id: Stripe Express account ID
+
+    Returns:
+        True once the profile is updated
+
+    Raises:
+        StripeConnectError: If the sync failed; the marker is kept so the
+            retry still covers the coalesced events
+    """
+    key = ACCOUNT_SYNC_KEY.format(account_id=account_id)
+    seen = _get_redis().get(key)
+
+    with get_db() as db:
+        if not StripeConnectService.handle_webhook_account_updated(account_id, db):
+            raise StripeConnectError(f"Account sync failed for {account_id}")
+
+    # Clear the marker only if no event arrived during the sync; otherwise
+    # the status just read may predate it, so sync once more
+    with _get_redis().pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            if pipe.get(key) == seen:
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+                return True
+        except redis.WatchError:
+            pass
+
+    sync_account_status.apply_async((account_id,), countdown=ACCOUNT_SYNC_DELAY)
+    return True
@@ -11,6 +11,8 @@ Comprehensive testing of:
 
 import pytest
 import json
+import redis
+from dataclasses import replace
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch, MagicMock
 
@@ -18,20 +20,32 @@ from onboarding.business_rules import (
     BusinessRulesEngine, RuleType, CommissionRule, MarketingStrategy,
     get_rules_engine, init_rules_engine
 )
+from onboarding.rules_sync import RulesSyncService, _unpack
+
+
+# Default replies for the Redis commands the engine issues
+REDIS_REPLIES = {
+    "get.return_value": None,
+    "setex.return_value": True,
+    "delete.return_value": 1,
+    "incr.return_value": 1,
+    "set.return_value": True,
+    "xadd.return_value": b"1-0",
+    "xrange.return_value": [],
+}
 
 
 @pytest.fixture
 def mock_redis():
     """Mock Redis client for testing"""
-    redis_mock = Mock()
-    redis_mock.get.return_value = None
-    redis_mock.setex.return_value = True
-    redis_mock.delete.return_value = 1
-    redis_mock.keys.return_value = []
-    redis_mock.set.return_value = True
-    redis_mock.lpush.return_value = 1
-    redis_mock.expire.return_value = True
-    redis_mock.lrange.return_value = []
+    # spec'd mocks only answer real Redis methods, so a typo in the engine
+    # fails loudly instead of returning another child mock
+    redis_mock = Mock(spec=redis.Redis)
+    redis_mock.configure_mock(**REDIS_REPLIES)
+    # Pipelined commands land on the client mock so assertions see them
+    pipe_mock = Mock(spec=redis.client.Pipeline)
+    pipe_mock.configure_mock(setex=redis_mock.setex, incr=redis_mock.incr, **{"execute.return_value": [True, 1]})
+    redis_mock.pipeline.return_value = pipe_mock
     return redis_mock
 
 
@@ -92,6 +106,22 @@ class TestCommissionRules:
         rate = rules_engine.get_commission_rate("invalid_tier", 1000)
         assert rate == 0.20  # Should return default rate
     
+    def test_bulk_commission_rates(self, rules_engine):
+        """Test batch quotes match single-volume quotes"""
+        volumes = [0, 500, 1000, 1500, 7500, 15000, 1000000]
+        
+        rates = rules_engine.get_commission_rates("entry", volumes)
+        
+        assert rates == [rules_engine.get_commission_rate("entry", v) for v in volumes]
+        assert rules_engine.get_commission_rates("invalid_tier", [1000, 2000]) == [0.20, 0.20]
+    
+    def test_unknown_tier_skips_redis(self, rules_engine, mock_redis):
+        """Test unknown tiers are answered without a Redis lookup"""
+        mock_redis.get.reset_mock()
+        
+        assert rules_engine.get_commission_rate("invalid_tier", 1000) == 0.20
+        mock_redis.get.assert_not_called()
+    
     def test_commission_with_redis_cache(self, rules_engine, mock_redis):
         """Test commission calculation with Redis caching"""
         # First call - should cache the result
@@ -202,6 +232,31 @@ class TestFeatureFlags:
         assert rules_engine.is_feature_enabled("email_verification") is True
         assert rules_engine.is_feature_enabled("marketing_automation") is False
 
+    def test_batch_feature_flag_check(self, rules_engine):
+        """Test checking several flags at once"""
+        result = rules_engine.are_features_enabled(
+            ["email_verification", "onlyfans_scraping", "non_existent_feature"]
+        )
+        
+        assert result == {
+            "email_verification": True,
+            "onlyfans_scraping": False,
+            "non_existent_feature": False
+        }
+    
+    def test_feature_flags_local_cache(self, rules_engine, mock_redis):
+        """Test repeated flag checks within the TTL skip Redis"""
+        flags_key = rules_engine._get_cache_key(RuleType.FEATURE_FLAGS)
+        
+        rules_engine.is_feature_enabled("email_verification")
+        rules_engine.is_feature_enabled("stripe_connect")
+        assert [c.args[0] for c in mock_redis.get.call_args_list].count(flags_key) == 1
+        
+        # Rules changes drop the local copy
+        rules_engine.clear_lookup_caches()
+        rules_engine.is_feature_enabled("email_verification")
+        assert [c.args[0] for c in mock_redis.get.call_args_list].count(flags_key) == 2
+
 
 class TestRulesUpdates:
     """Test dynamic rules updates"""
@@ -272,6 +327,26 @@ class TestRulesUpdates:
         
         assert success is False
     
+    def test_commission_rules_update_with_rule_objects(self, rules_engine):
+        """Test updating commission rules with CommissionRule objects, as the admin panel does"""
+        rules_engine.db_session_factory = MagicMock()
+        new_rules = {
+            "entry": CommissionRule(
+                tier="entry",
+                base_rate=0.22,
+                volume_thresholds=[{"threshold": 1000, "rate": 0.20}],
+                min_rate=0.15,
+                max_rate=0.25,
+                effective_date=datetime.utcnow()
+            )
+        }
+        
+        assert rules_engine.update_rules(RuleType.COMMISSION, new_rules, "admin_123") is True
+        assert rules_engine.get_commission_rate("entry", 1000) == 0.20
+        
+        invalid_rules = {"entry": replace(new_rules["entry"], min_rate=0.30)}
+        assert rules_engine.update_rules(RuleType.COMMISSION, invalid_rules, "admin_123") is False
+    
     def test_rules_versioning(self, rules_engine):
         """Test rules versioning system"""
         initial_version = rules_engine.get_rules_version()
@@ -293,6 +368,42 @@ class TestRulesUpdates:
         backup_calls = [call for call in mock_redis.setex.call_args_list 
                        if 'backup' in str(call)]
         assert len(backup_calls) > 0
+    
+    def test_snapshot_round_trip_rebuilds_rules(self, rules_engine, mock_redis):
+        """Test that a peer applying a sync snapshot gets rule objects back"""
+        sync_service = RulesSyncService(mock_redis)
+        commission = {
+            "entry": CommissionRule(
+                tier="entry",
+                base_rate=0.20,
+                volume_thresholds=[{"threshold": 1000, "rate": 0.18}],
+                min_rate=0.15,
+                max_rate=0.25,
+                effective_date=datetime.utcnow()
+            )
+        }
+        marketing = {
+            "micro": MarketingStrategy(
+                account_size="micro",
+                pricing_suggestions={"entry": (4.99, 9.99)},
+                content_schedule={"instagram": 5},
+                target_categories=["lifestyle"],
+                engagement_tactics=["daily_stories"],
+                priority_score=1.0
+            )
+        }
+        
+        for rule_type, rules in ((RuleType.COMMISSION, commission), (RuleType.MARKETING, marketing)):
+            data = sync_service._update_payload(
+                rule_type.value, 2, "admin:admin_123", "2026-01-01T00:00:00",
+                {"base_version": 1, "rules": rules}
+            )
+            payload = _unpack(data, "msgpack")
+            rules_engine.apply_rules_snapshot(payload["rule_type"], payload["rules"], payload["version"])
+            assert rules_engine.rules_cache[rule_type] == rules
+        
+        assert rules_engine.get_commission_rate("entry", 1000) == 0.18
+        assert isinstance(rules_engine.get_marketing_strategy("micro"), MarketingStrategy)
 
 
 class TestAuditLogging:
@@ -304,22 +415,21 @@ class TestAuditLogging:
         rules_engine.update_rules(RuleType.FEATURE_FLAGS, new_flags, "admin_123")
         
         # Verify audit log entry was created
-        mock_redis.lpush.assert_called()
-        mock_redis.expire.assert_called()
+        mock_redis.xadd.assert_called()
     
     def test_audit_log_retrieval(self, rules_engine, mock_redis):
         """Test audit log retrieval"""
         # Mock audit log entries
         mock_entries = [
-            json.dumps({
+            (b"1700000000000-0", {b"data": json.dumps({
                 "timestamp": datetime.utcnow().isoformat(),
                 "rule_type": "feature_flags",
                 "admin_user_id": "admin_123", 
                 "version": "1.1.0",
                 "action": "update_rules"
-            })
+            }).encode()})
         ]
-        mock_redis.lrange.return_value = mock_entries
+        mock_redis.xrange.return_value = mock_entries
         
         start_date = datetime.utcnow() - timedelta(days=1)
         end_date = datetime.utcnow()
@@ -328,7 +438,23 @@ class TestAuditLogging:
         
         assert len(audit_entries) == 1
         assert audit_entries[0]["admin_user_id"] == "admin_123"
-
+    
+    def test_audit_entry_id_uses_update_time(self, rules_engine, mock_redis):
+        """Test that audit entries are stamped with the update's own time"""
+        now = datetime(2026, 1, 1, 12, 0, 0)
+        rules_engine._log_rules_update(RuleType.FEATURE_FLAGS, "admin_123", 2, now)
+        
+        assert mock_redis.xadd.call_args.kwargs["id"] == "1767268800000-*"
+    
+    def test_audit_log_retrieval_decoded_responses(self, rules_engine, mock_redis):
+        """Test audit log retrieval from a client with decode_responses=True"""
+        mock_redis.xrange.return_value = [
+            ("1700000000000-0", {"data": json.dumps({"admin_user_id": "admin_123", "version": 2})})
+        ]
+        
+        audit_entries = rules_engine.get_audit_log(datetime.utcnow() - timedelta(days=1), datetime.utcnow())
+        
+        assert audit_entries == [{"admin_user_id": "admin_123", "version": 2}]
 
 class TestRulesEngineIntegration:
     """Test integration scenarios"""
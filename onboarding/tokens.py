@@ -149,7 +149,8 @@ class EmailTokenService:
         Clean up expired verification tokens
         
         Should be run periodically to prevent database bloat.
-        Removes tokens older than CLEANUP_THRESHOLD_HOURS.
+        Removes tokens that expired more than CLEANUP_THRESHOLD_HOURS ago,
+        as a range scan on the expires_at index.
         
         Returns:
             Number of tokens cleaned up
@@ -157,7 +158,7 @@ class EmailTokenService:
         cleanup_cutoff = datetime.utcnow() - timedelta(hours=CLEANUP_THRESHOLD_HOURS)
         
         deleted_count = db.query(VerificationToken).filter(
-            VerificationToken.created_at < cleanup_cutoff
+            VerificationToken.expires_at < cleanup_cutoff
         ).delete()
         
         db.commit()
@@ -210,13 +211,8 @@ def create_cleanup_task():
     """
     Factory function to create periodic cleanup task
     
-    Usage with background task runner (Celery, etc.):
-    
-    @periodic_task(run_every=crontab(minute=0))  # Run hourly
-    def cleanup_expired_tokens():
-        with get_db_session() as db:
-            count = EmailTokenService.cleanup_expired_tokens(db)
-            logger.info(f"Cleaned up {count} expired verification tokens")
+    The Celery deployment runs this hourly via beat as
+    onboarding.tasks.maintenance.purge_expired_verification_tokens.
     """
     def cleanup_task(db_session_factory):
         with db_session_factory() as db:
@@ -252,11 +252,11 @@ class EmailValidator:
 class ContentCategoryValidator:
     """Validator for content categories"""
     
-    VALID_CATEGORIES = {
+    VALID_CATEGORIES = frozenset({
         'lifestyle', 'fitness', 'adult', 'fashion', 'art',
         'music', 'gaming', 'education', 'comedy', 'food',
         'travel', 'beauty', 'technology', 'sports', 'other'
-    }
+    })
     
     MAX_CATEGORIES = 5
     